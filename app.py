@@ -3,25 +3,81 @@ Interface Streamlit para o Chatbot com IA e Sistema de Feedback
 """
 
 import streamlit as st
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from src.agent import Chatbot, PromptManager, ConversationManager
+from src.agent.chatbot import MAX_HISTORY
 from src.feedback import FeedbackProcessor
 
+def setup_logging():
+    """
+    Configura logging assíncrono
+    
+    O logger raiz recebe apenas um QueueHandler (enfileiramento rápido); a escrita
+    em arquivo e no console é feita por um QueueListener em thread separada.
+    Como o Streamlit reexecuta o script a cada interação, a configuração só é
+    aplicada uma vez por processo.
+    """
+    root = logging.getLogger()
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        return
+    
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    Path("data").mkdir(parents=True, exist_ok=True)
+    file_handler = logging.FileHandler('data/app.log')
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+
+
 # Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('data/app.log'),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Conteúdo fixo da sidebar
+_TOOLS_MD = """
+- **ViaCEP**: Consulta de CEPs brasileiros
+- **PokéAPI**: Informações sobre Pokémon
+- **IBGE**: Dados de estados e municípios do Brasil
+- **Open-Meteo**: Clima atual e previsão do tempo
+- **Open Library**: Informações sobre livros e autores
+- **TVMaze**: Informações sobre séries de TV
+- **Lyrics.ovh**: Letras de músicas
+"""
+
+_ABOUT_MD = """
+Sistema de chatbot com IA desenvolvido com:
+- **LLM**: Google Gemini
+- **Vector Store**: ChromaDB
+- **Interface**: Streamlit
+- **APIs**: ViaCEP, PokéAPI, IBGE, Open-Meteo, Open Library, TVMaze, Lyrics.ovh
+"""
+
+# Tamanho da página do chat: mensagens exibidas por vez (as anteriores sob demanda)
+CHAT_WINDOW_SIZE = 20
+
+# Intervalo (segundos) entre verificações da análise de feedbacks em background
+ANALYSIS_POLL_INTERVAL = 0.5
+
 # Configuração da página
 st.set_page_config(
     page_title="Chatbot com Feedback Inteligente",
@@ -29,61 +85,202 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# CSS customizado
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: bold;
-        color: #1E88E5;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .sub-header {
-        font-size: 1.2rem;
-        color: #666;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .chat-message {
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin-bottom: 1rem;
-        color: #000000;  /* Texto preto */
-    }
-    .user-message {
-        background-color: #E3F2FD;
-        border-left: 4px solid #1E88E5;
-    }
-    .user-message strong {
-        color: #1565C0;  /* Azul escuro para "Você:" */
-    }
-    .assistant-message {
-        background-color: #E8F5E9;  /* Verde claro em vez de cinza */
-        border-left: 4px solid #4CAF50;
-    }
-    .assistant-message strong {
-        color: #2E7D32;  /* Verde escuro para "Assistente:" */
-    }
-    .tool-output {
-        background-color: #FFF3E0;
-        border-left: 4px solid #FF9800;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin: 1rem 0;
-        color: #000000;  /* Texto preto */
-    }
-    .tool-output strong {
-        color: #E65100;  /* Laranja escuro para "Ferramentas:" */
-    }
-    .stats-box {
-        background-color: #F8F9FA;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border: 1px solid #DEE2E6;
-    }
-</style>
-""", unsafe_allow_html=True)
+# CSS customizado (cores gerais ficam no tema em .streamlit/config.toml)
+CSS_FILE = Path(__file__).parent / "static" / "custom.css"
+
+
+@st.cache_data
+def load_css(path: Path) -> str:
+    """Lê o arquivo de CSS customizado uma única vez por processo"""
+    return f"<style>{path.read_text(encoding='utf-8')}</style>"
+
+
+@st.cache_resource(show_spinner="Carregando modelo, ferramentas e base de conhecimento...")
+def get_chatbot(api_key: str) -> Chatbot:
+    """Retorna o chatbot compartilhado entre todas as sessões do processo"""
+    return Chatbot(api_key)
+
+
+@st.cache_resource(show_spinner="Carregando processador de feedback...")
+def get_feedback_processor(api_key: str) -> FeedbackProcessor:
+    """Retorna o processador de feedback compartilhado entre todas as sessões"""
+    return FeedbackProcessor(api_key)
+
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Retorna o pool de threads usado para análises de feedback em background"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="feedback-analysis")
+
+
+@st.cache_resource
+def get_stats_executor() -> ThreadPoolExecutor:
+    """Retorna o pool usado para ler estatísticas independentes em paralelo"""
+    return ThreadPoolExecutor(max_workers=3, thread_name_prefix="stats")
+
+
+@st.cache_data(show_spinner=False, max_entries=200)
+def _cached_session_stats(session_id: str, version: int, kind: str, _conversation_manager: ConversationManager):
+    """
+    Retorna estatísticas do histórico de conversas da sessão, recalculadas quando a versão muda
+    
+    Args:
+        session_id: Identificador da sessão (o histórico é por usuário)
+        version: Contador da sessão incrementado a cada alteração de estado
+        kind: Tipo de estatística ('conversations' ou 'sessions_summary')
+        _conversation_manager: Gerenciador da sessão (fora da chave do cache)
+    """
+    if kind == "conversations":
+        return _conversation_manager.get_statistics()
+    if kind == "sessions_summary":
+        return _conversation_manager.get_sessions_summary()
+    raise ValueError(f"Tipo de estatística desconhecido: {kind}")
+
+
+@st.cache_data(show_spinner=False, max_entries=200)
+def _cached_shared_stats(prompt_version: int, total_feedbacks: int, processed_feedbacks: int, kind: str,
+                         _prompt_manager: PromptManager, _feedback_processor: FeedbackProcessor):
+    """
+    Retorna estatísticas de prompts e feedbacks, recalculadas quando os contadores mudam
+    
+    Prompt e feedbacks são compartilhados por todas as sessões: a chave vem dos
+    próprios contadores (ver _shared_stats_key), então alterações feitas em outra
+    sessão também invalidam o cache.
+    
+    Args:
+        prompt_version: Versão atual do prompt
+        total_feedbacks: Quantidade de feedbacks registrados
+        processed_feedbacks: Quantidade de feedbacks já analisados
+        kind: Tipo de estatística ('prompt', 'feedback' ou 'recent_feedbacks')
+        _prompt_manager: Gerenciador de prompts (fora da chave do cache)
+        _feedback_processor: Processador de feedbacks (fora da chave do cache)
+    """
+    if kind == "prompt":
+        return _prompt_manager.get_statistics()
+    if kind == "feedback":
+        return _feedback_processor.get_statistics()
+    if kind == "recent_feedbacks":
+        return _feedback_processor.get_recent_feedbacks(10)
+    raise ValueError(f"Tipo de estatística desconhecido: {kind}")
+
+
+@st.cache_data(show_spinner=False, max_entries=200)
+def _cached_sidebar_stats(messages_count: int, prompt_version: int, total_feedbacks: int,
+                          processed_feedbacks: int, _chatbot: Chatbot, _prompt_manager: PromptManager,
+                          _feedback_processor: FeedbackProcessor) -> Tuple[Dict, Dict, Dict]:
+    """
+    Lê as estatísticas do chatbot, do prompt e dos feedbacks em paralelo
+    
+    As três leituras são independentes (vector store, histórico de prompts e
+    arquivo de feedbacks), então o tempo total é o da mais lenta, não a soma.
+    Chatbot, prompt e feedbacks são compartilhados entre as sessões: a chave vem
+    dos contadores exibidos, e não de um contador da sessão.
+    
+    Args:
+        messages_count: Mensagens respondidas nesta sessão
+        prompt_version: Versão atual do prompt
+        total_feedbacks: Quantidade de feedbacks registrados
+        processed_feedbacks: Quantidade de feedbacks já analisados
+        _chatbot: Chatbot compartilhado (fora da chave do cache)
+        _prompt_manager: Gerenciador de prompts (fora da chave do cache)
+        _feedback_processor: Processador de feedbacks (fora da chave do cache)
+        
+    Returns:
+        Tupla (estatísticas_chatbot, estatísticas_prompt, estatísticas_feedback)
+    """
+    executor = get_stats_executor()
+    futures = (
+        executor.submit(_chatbot.get_statistics, messages_count),
+        executor.submit(_prompt_manager.get_statistics),
+        executor.submit(_feedback_processor.get_statistics),
+    )
+    return tuple(future.result() for future in futures)
+
+
+@st.cache_data(show_spinner=False, max_entries=20)
+def _cached_prompt(version: int) -> str:
+    """Retorna o prompt atual; só relê quando a versão do prompt muda"""
+    return st.session_state.prompt_manager.get_current_prompt()
+
+
+@st.cache_data(show_spinner=False, max_entries=20)
+def _cached_prompt_history(total_versions: int, total_feedbacks: int) -> List[Dict]:
+    """Retorna o histórico de prompts; só relê quando surge versão ou feedback novo"""
+    return st.session_state.prompt_manager.get_history()
+
+
+def _shared_stats_key() -> Tuple[int, int, int]:
+    """Contadores de prompts e feedbacks que mudam a cada nova versão, feedback ou análise"""
+    feedback_processor = st.session_state.feedback_processor
+    return (
+        st.session_state.prompt_manager.get_current_version(),
+        len(feedback_processor.feedbacks),
+        feedback_processor._processed_count
+    )
+
+
+def get_stats(kind: str):
+    """Retorna estatísticas da sessão atual usando o cache"""
+    if kind in ("conversations", "sessions_summary"):
+        return _cached_session_stats(
+            st.session_state.conversation_manager.current_session_id,
+            st.session_state.stats_version,
+            kind,
+            st.session_state.conversation_manager
+        )
+    return _cached_shared_stats(
+        *_shared_stats_key(),
+        kind,
+        st.session_state.prompt_manager,
+        st.session_state.feedback_processor
+    )
+
+
+def bump_stats_version():
+    """Invalida as estatísticas em cache após uma alteração de estado"""
+    st.session_state.stats_version += 1
+
+
+def next_message_id() -> int:
+    """Retorna o próximo id de mensagem (igual à posição em st.session_state.messages)"""
+    msg_id = st.session_state.next_msg_id
+    st.session_state.next_msg_id += 1
+    return msg_id
+
+
+def get_recent_assistant_messages(limit: int = 5) -> List[Tuple[int, Dict]]:
+    """
+    Retorna as últimas respostas do assistente junto com sua posição no histórico
+    
+    Usa a lista de ids das respostas mantida em st.session_state.assistant_msg_ids,
+    então o custo não depende do tamanho da conversa.
+    
+    Args:
+        limit: Número máximo de respostas a retornar
+        
+    Returns:
+        Lista de tuplas (índice_global, mensagem)
+    """
+    messages = st.session_state.messages
+    return [(msg_id, messages[msg_id]) for msg_id in st.session_state.assistant_msg_ids[-limit:]]
+
+
+def format_rating(value: float) -> str:
+    """Formata a avaliação média para exibição (ex: '4.2/5')"""
+    return f"{value:.1f}/5"
+
+
+def request_global_rerun():
+    """Sinaliza que uma alteração feita em um fragmento afeta o restante da tela"""
+    st.session_state.needs_global_rerun = True
+
+
+def sync_global_rerun():
+    """Reexecuta o app inteiro se algum fragmento sinalizou alteração global"""
+    if st.session_state.needs_global_rerun:
+        st.session_state.needs_global_rerun = False
+        st.rerun(scope="app")
+
 
 def initialize_session():
     """Inicializa ou recupera estado da sessão"""
@@ -94,16 +291,22 @@ def initialize_session():
             st.error("GEMINI_API_KEY não encontrada!")
             st.stop()
         
-        # Inicializa componentes
-        st.session_state.chatbot = Chatbot(api_key)
-        st.session_state.feedback_processor = FeedbackProcessor(api_key)
+        # Componentes pesados (LLM, ChromaDB, ferramentas) são globais ao processo
+        st.session_state.chatbot = get_chatbot(api_key)
+        st.session_state.feedback_processor = get_feedback_processor(api_key)
         st.session_state.prompt_manager = st.session_state.chatbot.prompt_manager
         st.session_state.conversation_manager = ConversationManager()
         
         # Inicia uma NOVA sessão (não carrega mensagens antigas)
         st.session_state.conversation_manager.start_new_session()
         st.session_state.messages = []  # Começa vazio
+        st.session_state.next_msg_id = 0
+        st.session_state.assistant_msg_ids = []  # Ids das respostas do assistente
+        st.session_state.chat_window = CHAT_WINDOW_SIZE  # Mensagens exibidas no chat
+        st.session_state.chat_history = deque(maxlen=MAX_HISTORY)  # Histórico enviado ao LLM (por usuário)
         st.session_state.feedback_history = []
+        st.session_state.stats_version = 0
+        st.session_state.needs_global_rerun = False
         st.session_state.initialized = True
         
         logger.info("Nova sessão inicializada")
@@ -114,410 +317,594 @@ def render_sidebar():
     with st.sidebar:
         st.markdown("### Informações do Sistema")
         
-        # Estatísticas
-        stats = st.session_state.chatbot.get_statistics()
-        prompt_stats = st.session_state.prompt_manager.get_statistics()
-        feedback_stats = st.session_state.feedback_processor.get_statistics()
-        
-        st.markdown("#### Estatísticas")
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric("Mensagens", stats["messages_count"])
-            st.metric("Versão Prompt", prompt_stats["current_version"])
-        with col2:
-            st.metric("Feedbacks", feedback_stats["total_feedbacks"])
-            st.metric("Avaliação Média", f"{feedback_stats['average_rating']:.1f}/5")
+        _sidebar_stats()
         
         st.markdown("---")
         
         # Controles
         st.markdown("#### Controles")
         
-        if st.button("Limpar Conversa", use_container_width=True):
-            st.session_state.chatbot.clear_history()
-            st.session_state.conversation_manager.clear_current_session()
-            st.session_state.messages = []
-            
-            st.success("Conversa limpa! Nova sessão iniciada.")
-            st.rerun()
+        st.button("Limpar Conversa", use_container_width=True, on_click=_clear_conversation_cb)
         
         st.markdown("---")
         
-        # Ferramentas disponíveis
-        st.markdown("#### Ferramentas Disponíveis")
-        st.markdown("""
-        - **ViaCEP**: Consulta de CEPs brasileiros
-        - **PokéAPI**: Informações sobre Pokémon
-        - **IBGE**: Dados de estados e municípios do Brasil
-        - **Open-Meteo**: Clima atual e previsão do tempo
-        - **Open Library**: Informações sobre livros e autores
-        - **TVMaze**: Informações sobre séries de TV
-        - **Lyrics.ovh**: Letras de músicas
-        """)
+        _static_sidebar()
+
+
+@st.fragment
+def _sidebar_stats():
+    """Renderiza as métricas da sidebar (lidas do cache de estatísticas)"""
+    stats, prompt_stats, feedback_stats = _cached_sidebar_stats(
+        len(st.session_state.assistant_msg_ids),
+        *_shared_stats_key(),
+        st.session_state.chatbot,
+        st.session_state.prompt_manager,
+        st.session_state.feedback_processor
+    )
+    
+    st.markdown("#### Estatísticas")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Mensagens", stats["messages_count"])
+        st.metric("Versão Prompt", prompt_stats["current_version"])
+    with col2:
+        st.metric("Feedbacks", feedback_stats["total_feedbacks"])
+        st.metric("Avaliação Média", format_rating(feedback_stats["average_rating"]))
+
+
+@st.fragment
+def _static_sidebar():
+    """Renderiza as seções fixas da sidebar (não dependem do estado da sessão)"""
+    st.markdown("#### Ferramentas Disponíveis")
+    st.markdown(_TOOLS_MD)
+    
+    st.markdown("---")
+    st.markdown("#### Sobre")
+    st.markdown(_ABOUT_MD)
+
+
+@st.fragment
+def _render_message(msg: Dict):
+    """Renderiza uma mensagem do histórico do chat"""
+    with st.chat_message(msg["role"]):
+        st.markdown(msg["content"])
         
-        st.markdown("---")
-        st.markdown("#### Sobre")
-        st.markdown("""
-        Sistema de chatbot com IA desenvolvido com:
-        - **LLM**: Google Gemini
-        - **Vector Store**: ChromaDB
-        - **Interface**: Streamlit
-        - **APIs**: ViaCEP, PokéAPI, IBGE, Open-Meteo, Open Library, TVMaze, Lyrics.ovh
-        """)
+        # Se houver ferramentas usadas, mostra em expander
+        if msg.get("tools_output"):
+            with st.expander(f"Ver detalhes da ferramenta: {msg['tools_label']}", expanded=False):
+                st.markdown(msg["tools_output"])
+
+
+def _render_message_batch(messages: List[Dict]):
+    """
+    Renderiza um bloco de mensagens antigas com o mínimo de elementos
+    
+    Mensagens sem saída de ferramenta consecutivas viram um único st.markdown;
+    só as que têm detalhes de ferramenta precisam de elementos próprios (expander).
+    
+    Args:
+        messages: Mensagens a renderizar, em ordem cronológica
+    """
+    parts = []
+    for msg in messages:
+        if msg.get("tools_output"):
+            if parts:
+                st.markdown("\n\n---\n\n".join(parts))
+                parts = []
+            _render_message(msg)
+        else:
+            author = "Você" if msg["role"] == "user" else "Assistente"
+            parts.append(f"**{author}:**\n\n{msg['content']}")
+    
+    if parts:
+        st.markdown("\n\n---\n\n".join(parts))
 
 
+@st.fragment
 def render_chat_area():
     """Renderiza área principal do chat"""
-    st.markdown('<div class="main-header">Chat com Agente IA</div>', 
-                unsafe_allow_html=True)
-    st.markdown('<div class="sub-header">Converse com o assistente virtual inteligente</div>', 
-                unsafe_allow_html=True)
+    st.html('<div class="main-header">Chat com Agente IA</div>')
+    st.html('<div class="sub-header">Converse com o assistente virtual inteligente</div>')
     
     # Container para mensagens
     chat_container = st.container()
     
-    # Exibe histórico
+    # Exibe histórico: só as mensagens mais recentes são renderizadas sempre
     with chat_container:
-        for i, msg in enumerate(st.session_state.messages):
-            if msg["role"] == "user":
-                st.markdown(f"""
-                <div class="chat-message user-message">
-                    <strong>Você:</strong><br>
-                    {msg["content"]}
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                # Mostra resposta do assistente
-                st.markdown(f"""
-                <div class="chat-message assistant-message">
-                    <strong>Assistente:</strong><br>
-                    {msg["content"]}
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Se houver ferramentas usadas, mostra em expander
-                if msg.get("tools_output"):
-                    tools_used_names = [tool[0] for tool in msg.get("tools_used", [])]
-                    tools_label = ", ".join(tools_used_names) if tools_used_names else "Ferramentas"
-                    
-                    with st.expander(f"Ver detalhes da ferramenta: {tools_label}", expanded=False):
-                        st.markdown(msg["tools_output"])
+        messages = st.session_state.messages
+        hidden_count = max(0, len(messages) - st.session_state.chat_window)
+        recent_start = max(0, len(messages) - CHAT_WINDOW_SIZE)
+        
+        # Mensagens fora da janela não são formatadas nem enviadas ao navegador
+        if hidden_count:
+            st.button(f"Carregar mensagens anteriores ({hidden_count} ocultas)",
+                      on_click=_load_older_messages_cb)
+        
+        # Páginas anteriores já carregadas são renderizadas em bloco
+        _render_message_batch(messages[hidden_count:recent_start])
+        
+        for msg in messages[recent_start:]:
+            _render_message(msg)
     
     # Input do usuário
     st.markdown("---")
     user_input = st.chat_input("Digite sua mensagem aqui...")
     
     if user_input:
+        # Um único timestamp por turno (pergunta e resposta)
+        now = datetime.now().isoformat()
+        
         # Adiciona mensagem do usuário
         st.session_state.messages.append({
+            "id": next_message_id(),
             "role": "user",
             "content": user_input,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now
         })
-        st.session_state.conversation_manager.add_message("user", user_input)
+        st.session_state.conversation_manager.add_message("user", user_input, timestamp=now)
         
-        # Processa com o chatbot
-        with st.spinner("Pensando..."):
-            response_data = st.session_state.chatbot.chat(user_input)
+        # Exibe a pergunta e transmite a resposta à medida que é gerada
+        response_data = {}
+        with chat_container:
+            with st.chat_message("user"):
+                st.markdown(user_input)
+            
+            with st.chat_message("assistant"):
+                response = st.write_stream(
+                    st.session_state.chatbot.chat_stream(
+                        user_input, st.session_state.chat_history, response_data
+                    )
+                )
         
         # Extrai dados da resposta
-        response = response_data.get("response", "")
         tools_used = response_data.get("tools_used", [])
         tools_output = response_data.get("tools_output", "")
         
         # Adiciona resposta do assistente
+        assistant_id = next_message_id()
+        st.session_state.assistant_msg_ids.append(assistant_id)
         st.session_state.messages.append({
+            "id": assistant_id,
             "role": "assistant",
             "content": response,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "tools_used": tools_used,
-            "tools_output": tools_output
+            "tools_output": tools_output,
+            "tools_label": ", ".join(tool[0] for tool in tools_used) or "Ferramentas"
         })
         st.session_state.conversation_manager.add_message(
-            "assistant", response, tools_used, tools_output
+            "assistant", response, tools_used, tools_output, timestamp=now
         )
-        
-        st.rerun()
+        bump_stats_version()
+        request_global_rerun()
+    
+    # Sidebar e aba de feedback precisam refletir a nova mensagem
+    sync_global_rerun()
 
 
-def render_feedback_area():
-    """Renderiza área de feedback e melhorias"""
-    st.markdown('<div class="main-header">Feedback e Melhorias</div>', 
-                unsafe_allow_html=True)
-    st.markdown('<div class="sub-header">Ajude a melhorar o assistente com seu feedback</div>', 
-                unsafe_allow_html=True)
+def _load_older_messages_cb():
+    """Callback do botão 'Carregar mensagens anteriores': amplia a janela do chat"""
+    st.session_state.chat_window += CHAT_WINDOW_SIZE
+
+
+def _clear_conversation_cb():
+    """Callback do botão 'Limpar Conversa': inicia uma nova sessão de chat"""
+    st.session_state.chat_history = deque(maxlen=MAX_HISTORY)
+    st.session_state.conversation_manager.clear_current_session()
+    st.session_state.messages = []
+    st.session_state.next_msg_id = 0
+    st.session_state.assistant_msg_ids = []
+    st.session_state.chat_window = CHAT_WINDOW_SIZE
+    bump_stats_version()
     
-    # Tabs para organizar conteúdo
-    tab1, tab2, tab3, tab4 = st.tabs(["Dar Feedback", "Histórico Feedbacks", "Histórico Conversas", "Prompt Atual"])
+    st.toast("Conversa limpa! Nova sessão iniciada.")
+
+
+def _submit_feedback_cb(user_content: str, agent_content: str):
+    """
+    Callback do formulário de feedback: registra o feedback e agenda a análise
     
-    with tab1:
-        st.markdown("### Enviar Feedback")
-        
-        if len(st.session_state.messages) < 2:
-            st.info("Converse com o assistente primeiro para poder dar feedback!")
+    Args:
+        user_content: Pergunta do usuário que originou a resposta avaliada
+        agent_content: Resposta do assistente avaliada
+    """
+    feedback_text = st.session_state.feedback_text
+    if not feedback_text.strip():
+        st.session_state.feedback_error = "Por favor, escreva seu feedback!"
+        return
+    
+    # Registra feedback
+    feedback_data = st.session_state.feedback_processor.add_feedback(
+        user_message=user_content,
+        agent_response=agent_content,
+        feedback_text=feedback_text,
+        rating=st.session_state.feedback_rating
+    )
+    
+    st.session_state.feedback_history.append(feedback_data)
+    st.session_state.prompt_manager.increment_feedback_count()
+    bump_stats_version()
+    
+    st.session_state.feedback_notice = "Feedback enviado com sucesso!"
+    
+    if feedback_data.get("auto_process", False):
+        if "analyze_future" in st.session_state:
+            # Já existe análise pendente: este feedback entra na próxima, ao término dela
+            st.session_state.analysis_requested = True
         else:
-            # Seleção da mensagem para feedback
-            recent_messages = [
-                msg for msg in st.session_state.messages 
-                if msg["role"] == "assistant"
-            ][-5:]
-            
-            if recent_messages:
-                st.markdown("**Selecione a resposta sobre a qual deseja dar feedback:**")
-                
-                selected_idx = st.selectbox(
-                    "Escolha uma resposta:",
-                    range(len(recent_messages)),
-                    format_func=lambda i: f"Resposta {len(recent_messages)-i}: {recent_messages[-(i+1)]['content'][:50]}...",
-                    key="feedback_select"
-                )
-                
-                selected_msg = recent_messages[-(selected_idx+1)]
-                
-                # Encontra mensagem do usuário correspondente
-                msg_idx = st.session_state.messages.index(selected_msg)
-                user_msg = st.session_state.messages[msg_idx - 1] if msg_idx > 0 else None
-                
-                # Exibe contexto
-                if user_msg:
-                    st.markdown("**Contexto:**")
-                    st.info(f"**Você perguntou:** {user_msg['content']}")
-                    st.success(f"**Assistente respondeu:** {selected_msg['content'][:200]}...")
-                
-                with st.form("feedback_form"):
-                    st.markdown("**Avalie a resposta:**")
-                    rating = st.slider("Avaliação", 1, 5, 3, 
-                                     help="1 = Muito ruim, 5 = Excelente")
-                    
-                    feedback_text = st.text_area(
-                        "Seu feedback (o que pode melhorar?):",
-                        placeholder="Exemplo: A resposta foi muito genérica, poderia ser mais específica...",
-                        height=100
-                    )
-                    
-                    submit = st.form_submit_button("Enviar Feedback", 
-                                                  use_container_width=True,
-                                                  type="primary")
-                
-                # Processa feedback fora do form
-                if submit:
-                    if not feedback_text.strip():
-                        st.error("Por favor, escreva seu feedback!")
-                    else:
-                        # Registra feedback
-                        feedback_data = st.session_state.feedback_processor.add_feedback(
-                            user_message=user_msg["content"] if user_msg else "",
-                            agent_response=selected_msg["content"],
-                            feedback_text=feedback_text,
-                            rating=rating
-                        )
-                        
-                        st.session_state.feedback_history.append(feedback_data)
-                        st.session_state.prompt_manager.increment_feedback_count()
-                        
-                        st.success("Feedback enviado com sucesso!")
-                        
-                        if feedback_data.get("auto_process", False):
-                            with st.spinner("Processando feedbacks automaticamente..."):
-                                current_prompt = st.session_state.prompt_manager.get_current_prompt()
-                                new_prompt, improvements = st.session_state.feedback_processor.analyze_feedbacks(
-                                    current_prompt,
-                                    recent_count=3
-                                )
-                                
-                                if new_prompt != current_prompt:
-                                    new_version = st.session_state.prompt_manager.update_prompt(
-                                        new_prompt,
-                                        improvements
-                                    )
-                                    
-                                    st.session_state.last_update_result = {
-                                        'success': True,
-                                        'version': new_version,
-                                        'improvements': improvements,
-                                        'auto': True
-                                    }
-                        
-                        st.rerun()
-
-                # Mostra resultado do processamento automático
-                if 'last_update_result' in st.session_state:
-                    result = st.session_state.last_update_result
-                    
-                    if result.get('success'):
-                        auto_text = " (automático)" if result.get('auto') else ""
-                        st.success(f"Prompt atualizado para versão {result['version']}{auto_text}!")
-                        
-                        with st.expander("Ver melhorias aplicadas", expanded=True):
-                            for imp in result.get('improvements', []):
-                                st.markdown(f"- {imp}")
-                    else:
-                        st.info(result.get('message', 'Processamento concluído'))
-                    
-                    # Limpa resultado após mostrar
-                    del st.session_state.last_update_result
-                    
-    with tab2:
-        st.markdown("### Histórico de Feedbacks")
+            _start_analysis()
+    
+    # Estatísticas da sidebar mudaram
+    request_global_rerun()
+
+
+def _clear_history_cb():
+    """Callback do botão 'Limpar Histórico'"""
+    st.session_state.conversation_manager.clear_all_history()
+    bump_stats_version()
+    st.session_state.history_notice = "Histórico limpo!"
+
+
+def _delete_session_cb(session_id: str, session_num: int):
+    """Callback do botão de remoção de uma sessão do histórico"""
+    st.session_state.conversation_manager.delete_session(session_id)
+    bump_stats_version()
+    st.session_state.history_notice = f"Sessão #{session_num} removida!"
+
+
+def _analyze_and_apply(feedback_processor: FeedbackProcessor, prompt_manager: PromptManager,
+                       current_prompt: str) -> Optional[Dict]:
+    """
+    Analisa os feedbacks recentes e aplica o novo prompt, tudo na thread de background
+    
+    O prompt é gravado aqui, e não no fragmento que acompanha a análise: se a aba for
+    fechada ou recarregada no meio, os feedbacks já marcados como processados não
+    perdem o resultado.
+    
+    Returns:
+        Dicionário para last_update_result, ou None se o prompt não mudou
+    """
+    new_prompt, improvements = feedback_processor.analyze_feedbacks(current_prompt, 3)
+    if new_prompt == current_prompt:
+        return None
+    
+    new_version = prompt_manager.update_prompt(new_prompt, improvements)
+    return {
+        'success': True,
+        'version': new_version,
+        'improvements': improvements,
+        'auto': True
+    }
+
+
+def _start_analysis():
+    """Agenda a análise dos feedbacks recentes em background (não trava a interface)"""
+    # Objetos são capturados aqui: as threads do pool não acessam st.session_state
+    st.session_state.analyze_future = get_executor().submit(
+        _analyze_and_apply,
+        st.session_state.feedback_processor,
+        st.session_state.prompt_manager,
+        st.session_state.prompt_manager.get_current_prompt()
+    )
+
+
+def render_analysis_status():
+    """Exibe o andamento da análise de feedbacks em background, se houver uma"""
+    if "analyze_future" in st.session_state:
+        _poll_analysis()
+
+
+@st.fragment(run_every=ANALYSIS_POLL_INTERVAL)
+def _poll_analysis():
+    """Verifica periodicamente a análise em background e exibe o resultado ao terminar"""
+    future = st.session_state.get("analyze_future")
+    if future is None:
+        return
+    
+    if not future.done():
+        st.info("Processando feedbacks automaticamente...")
+        return
+    
+    del st.session_state.analyze_future
+    
+    try:
+        result = future.result()
+    except Exception as e:
+        logger.error(f"Erro na análise de feedbacks em background: {e}")
+        st.session_state.last_update_result = {
+            'success': False,
+            'message': f"Erro ao processar feedbacks: {str(e)}"
+        }
+    else:
+        if result is not None:
+            bump_stats_version()
+            st.session_state.last_update_result = result
+    
+    # Feedbacks enviados durante a análise são processados juntos, a partir do novo prompt
+    if st.session_state.pop("analysis_requested", False):
+        _start_analysis()
+    
+    # Versão do prompt mudou: atualiza sidebar e abas
+    st.rerun(scope="app")
+
+
+@st.fragment
+def _render_feedback_form_tab():
+    """Aba "Dar Feedback": seleção da resposta e formulário de avaliação"""
+    st.markdown("### Enviar Feedback")
+    
+    render_analysis_status()
+    
+    # Ids das respostas já apontam para sua posição no histórico: sem buscas lineares
+    recent_messages = get_recent_assistant_messages(5)
+    
+    if not recent_messages:
+        st.info("Converse com o assistente primeiro para poder dar feedback!")
+    else:
+        st.markdown("**Selecione a resposta sobre a qual deseja dar feedback:**")
         
-        feedback_stats = st.session_state.feedback_processor.get_statistics()
+        # Rótulos montados uma vez (mais recente primeiro) em vez de a cada opção
+        labels = [
+            f"Resposta {number}: {msg['content'][:50]}..."
+            for number, (_, msg) in zip(range(len(recent_messages), 0, -1), reversed(recent_messages))
+        ]
         
-        if not st.session_state.feedback_processor.feedbacks:
-            st.info("Nenhum feedback registrado ainda.")
-        else:
-            # Estatísticas
-            st.markdown(f"**Total de feedbacks:** {feedback_stats['total_feedbacks']}")
-            st.markdown(f"**Avaliação média:** {feedback_stats['average_rating']:.1f}/5")
-            
-            # Controle de quantidade a exibir
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.markdown("---")
-            with col2:
-                show_all = st.checkbox("Mostrar todos", value=False)
-            
-            # Determina quantos mostrar
-            if show_all:
-                recent_feedbacks = st.session_state.feedback_processor.feedbacks
-            else:
-                recent_feedbacks = st.session_state.feedback_processor.get_recent_feedbacks(10)
-            
-            # Mostra feedbacks (mais recentes primeiro)
-            for fb in reversed(recent_feedbacks):
-                with st.expander(
-                    f"Feedback #{fb['id']} - "
-                    f"{'⭐' * fb['rating']} ({fb['rating']}/5) - "
-                    f"{'Processado' if fb.get('processed') else '⏳ Pendente'}"
-                ):
-                    st.markdown(f"**Data:** {fb['timestamp']}")
-                    st.markdown(f"**Usuário perguntou:** {fb['user_message']}")
-                    st.markdown(f"**Agente respondeu:** {fb['agent_response'][:200]}...")
-                    st.markdown(f"**Feedback:** {fb['feedback_text']}")
+        selected_idx = st.selectbox(
+            "Escolha uma resposta:",
+            range(len(labels)),
+            format_func=labels.__getitem__,
+            key="feedback_select"
+        )
         
-    with tab3:
-        st.markdown("### Histórico de Conversas")
+        msg_idx, selected_msg = recent_messages[-(selected_idx+1)]
         
-        st.info("Todas as conversas são salvas automaticamente no histórico.")
+        # Mensagem do usuário correspondente é a imediatamente anterior
+        user_msg = st.session_state.messages[msg_idx - 1] if msg_idx > 0 else None
         
-        # Carrega todas as sessões do histórico
-        all_sessions = st.session_state.conversation_manager.get_all_sessions()
+        # Exibe contexto
+        if user_msg:
+            st.markdown("**Contexto:**")
+            st.info(f"**Você perguntou:** {user_msg['content']}")
+            st.success(f"**Assistente respondeu:** {selected_msg['content'][:200]}...")
         
-        if not all_sessions:
-            st.info("Nenhuma conversa no histórico ainda. Comece a conversar e suas mensagens serão salvas automaticamente!")
-        else:
-            # Estatísticas
-            stats = st.session_state.conversation_manager.get_statistics()
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Total de Sessões", stats["total_sessions"])
-            with col2:
-                st.metric("Total de Mensagens", stats["total_messages"])
+        with st.form("feedback_form"):
+            st.markdown("**Avalie a resposta:**")
+            st.slider("Avaliação", 1, 5, 3, 
+                      help="1 = Muito ruim, 5 = Excelente",
+                      key="feedback_rating")
             
-            st.markdown("---")
+            st.text_area(
+                "Seu feedback (o que pode melhorar?):",
+                placeholder="Exemplo: A resposta foi muito genérica, poderia ser mais específica...",
+                height=100,
+                key="feedback_text"
+            )
             
-            # Opção de limpar o histórico
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.markdown("**Sessões Anteriores:**")
-            with col2:
-                if st.button("Limpar Histórico", use_container_width=True):
-                    st.session_state.conversation_manager.clear_all_history()
-                    st.success("Histórico limpo!")
-                    st.rerun()
+            st.form_submit_button("Enviar Feedback", 
+                                  use_container_width=True,
+                                  type="primary",
+                                  on_click=_submit_feedback_cb,
+                                  args=(user_msg["content"] if user_msg else "",
+                                        selected_msg["content"]))
+        
+        if "feedback_error" in st.session_state:
+            st.error(st.session_state.pop("feedback_error"))
+        if "feedback_notice" in st.session_state:
+            st.success(st.session_state.pop("feedback_notice"))
+
+        # Mostra resultado do processamento automático
+        if 'last_update_result' in st.session_state:
+            result = st.session_state.last_update_result
             
-            # Mostra cada sessão (mais recentes primeiro)
-            for idx, session in enumerate(reversed(all_sessions)):
-                session_num = len(all_sessions) - idx
-                started = session["started_at"][:19].replace("T", " ")
-                msg_count = session["message_count"]
-                
-                # Identifica ferramentas usadas nesta sessão
-                tools_in_session = set()
-                for msg in session["messages"]:
-                    if msg["role"] == "assistant" and msg.get("tools_used"):
-                        for tool_name, _ in msg["tools_used"]:
-                            tools_in_session.add(tool_name)
+            if result.get('success'):
+                auto_text = " (automático)" if result.get('auto') else ""
+                st.success(f"Prompt atualizado para versão {result['version']}{auto_text}!")
                 
-                tools_str = f" - {', '.join(tools_in_session)}" if tools_in_session else ""
-                
-                with st.expander(
-                    f"Sessão #{session_num} - {msg_count} mensagens{tools_str} - {started}",
-                    expanded=False
-                ):
-                    # Mostra conversas da sessão
-                    messages = session["messages"]
-                    
-                    for i in range(0, len(messages), 2):
-                        if i + 1 < len(messages):
-                            user_msg = messages[i]
-                            assistant_msg = messages[i + 1]
-                            
-                            # Pergunta
-                            st.markdown("**Você:**")
-                            st.info(user_msg["content"])
-                            
-                            # Resposta
-                            st.markdown("**Assistente:**")
-                            st.success(assistant_msg["content"])
-                            
-                            # Ferramentas usadas
-                            if assistant_msg.get("tools_used"):
-                                with st.expander("Ferramentas utilizadas"):
-                                    for tool_name, tool_params in assistant_msg["tools_used"]:
-                                        st.markdown(f"- **{tool_name}**: `{tool_params}`")
-                                    
-                                    if assistant_msg.get("tools_output"):
-                                        st.markdown("---")
-                                        st.markdown(assistant_msg["tools_output"])
-                            
-                            if i + 2 < len(messages):
-                                st.markdown("---")
-                    
-                    # Botão para deletar esta sessão
-                    st.markdown("---")
-                    if st.button(f"Deletar Sessão #{session_num}", key=f"del_{session['session_id']}"):
-                        st.session_state.conversation_manager.delete_session(session["session_id"])
-                        st.success(f"Sessão #{session_num} removida!")
-                        st.rerun()
+                with st.expander("Ver melhorias aplicadas", expanded=True):
+                    for imp in result.get('improvements', []):
+                        st.markdown(f"- {imp}")
+            else:
+                st.info(result.get('message', 'Processamento concluído'))
+            
+            # Limpa resultado após mostrar
+            del st.session_state.last_update_result
     
-    with tab4:
-        st.markdown("### Prompt Atual do Sistema")
+    # Feedback enviado altera estatísticas exibidas fora deste fragmento
+    sync_global_rerun()
+
+
+@st.fragment
+def _render_feedback_history_tab():
+    """Aba "Histórico Feedbacks": lista os feedbacks registrados"""
+    st.markdown("### Histórico de Feedbacks")
+    
+    feedback_stats = get_stats("feedback")
+    
+    if not st.session_state.feedback_processor.feedbacks:
+        st.info("Nenhum feedback registrado ainda.")
+    else:
+        # Estatísticas
+        st.markdown(f"**Total de feedbacks:** {feedback_stats['total_feedbacks']}")
+        st.markdown(f"**Avaliação média:** {format_rating(feedback_stats['average_rating'])}")
+        
+        # Controle de quantidade a exibir
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.markdown("---")
+        with col2:
+            show_all = st.checkbox("Mostrar todos", value=False)
         
-        prompt_stats = st.session_state.prompt_manager.get_statistics()
-        current_prompt = st.session_state.prompt_manager.get_current_prompt()
+        # Determina quantos mostrar
+        if show_all:
+            recent_feedbacks = st.session_state.feedback_processor.feedbacks
+        else:
+            recent_feedbacks = get_stats("recent_feedbacks")
         
-        col1, col2, col3 = st.columns(3)
+        # Mostra feedbacks (mais recentes primeiro)
+        for fb in reversed(recent_feedbacks):
+            with st.expander(
+                f"Feedback #{fb['id']} - "
+                f"{'⭐' * fb['rating']} ({fb['rating']}/5) - "
+                f"{'Processado' if fb.get('processed') else '⏳ Pendente'}"
+            ):
+                st.markdown(
+                    f"**Data:** {fb['timestamp']}\n\n"
+                    f"**Usuário perguntou:** {fb['user_message']}\n\n"
+                    f"**Agente respondeu:** {fb['agent_response'][:200]}...\n\n"
+                    f"**Feedback:** {fb['feedback_text']}"
+                )
+
+
+@st.fragment
+def _render_conversation_history_tab():
+    """Aba "Histórico Conversas": sessões salvas e suas mensagens"""
+    st.markdown("### Histórico de Conversas")
+    
+    st.info("Todas as conversas são salvas automaticamente no histórico.")
+    
+    if "history_notice" in st.session_state:
+        st.success(st.session_state.pop("history_notice"))
+    
+    # Carrega só o resumo das sessões; as mensagens são lidas sob demanda
+    all_sessions = get_stats("sessions_summary")
+    
+    if not all_sessions:
+        st.info("Nenhuma conversa no histórico ainda. Comece a conversar e suas mensagens serão salvas automaticamente!")
+    else:
+        # Estatísticas
+        stats = get_stats("conversations")
+        
+        col1, col2 = st.columns(2)
         with col1:
-            st.metric("Versão Atual", prompt_stats["current_version"])
+            st.metric("Total de Sessões", stats["total_sessions"])
         with col2:
-            st.metric("Total de Versões", prompt_stats["total_versions"])
-        with col3:
-            st.metric("Feedbacks Recebidos", prompt_stats["total_feedbacks"])
+            st.metric("Total de Mensagens", stats["total_messages"])
         
         st.markdown("---")
-        st.markdown("#### Prompt em Uso:")
-        st.code(current_prompt, language="markdown")
         
-        st.markdown("---")
-        st.markdown("#### Histórico de Versões:")
+        # Opção de limpar o histórico
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.markdown("**Sessões Anteriores:**")
+        with col2:
+            st.button("Limpar Histórico", use_container_width=True, on_click=_clear_history_cb)
         
-        history = st.session_state.prompt_manager.get_history()
-        for prompt_data in reversed(history):
+        # Mostra cada sessão (o resumo já vem das mais recentes para as mais antigas)
+        for session in all_sessions:
+            session_num = session["number"]
+            started = session["started_at"][:19].replace("T", " ")
+            msg_count = session["message_count"]
+            
+            tools_in_session = session["tools_used"]
+            tools_str = f" - {', '.join(tools_in_session)}" if tools_in_session else ""
+            
             with st.expander(
-                f"Versão {prompt_data['version']} - "
-                f"{prompt_data['timestamp'][:10]} - "
-                f"{prompt_data['feedback_count']} feedbacks"
+                f"Sessão #{session_num} - {msg_count} mensagens{tools_str} - {started}",
+                expanded=False
             ):
-                st.markdown("**Melhorias aplicadas:**")
-                for imp in prompt_data.get("improvements", []):
-                    st.markdown(f"- {imp}")
+                # Mensagens da sessão só são carregadas quando o usuário pede
+                show_messages = st.toggle("Mostrar mensagens", key=f"open_{session['session_id']}")
+                messages = (
+                    st.session_state.conversation_manager.get_session_messages(session["session_id"])
+                    if show_messages else []
+                )
+                
+                # Percorre os pares (pergunta, resposta) sem índices nem cópias da lista
+                pairs = iter(messages)
+                for pair_number, (user_msg, assistant_msg) in enumerate(zip(pairs, pairs)):
+                    if pair_number:
+                        st.markdown("---")
+                    
+                    # Pergunta
+                    st.markdown("**Você:**")
+                    st.info(user_msg["content"])
+                    
+                    # Resposta
+                    st.markdown("**Assistente:**")
+                    st.success(assistant_msg["content"])
+                    
+                    # Ferramentas usadas
+                    if assistant_msg.get("tools_used"):
+                        with st.expander("Ferramentas utilizadas"):
+                            for tool_name, tool_params in assistant_msg["tools_used"]:
+                                st.markdown(f"- **{tool_name}**: `{tool_params}`")
+                            
+                            if assistant_msg.get("tools_output"):
+                                st.markdown("---")
+                                st.markdown(assistant_msg["tools_output"])
                 
-                st.markdown("**Prompt:**")
-                st.code(prompt_data["prompt"], language="markdown")
+                # Botão para deletar esta sessão
+                st.markdown("---")
+                st.button(f"Deletar Sessão #{session_num}", key=f"del_{session['session_id']}",
+                          on_click=_delete_session_cb, args=(session["session_id"], session_num))
+
+
+@st.fragment
+def _render_prompt_tab():
+    """Aba "Prompt Atual": prompt em uso e histórico de versões"""
+    st.markdown("### Prompt Atual do Sistema")
+    
+    prompt_stats = get_stats("prompt")
+    current_prompt = _cached_prompt(prompt_stats["current_version"])
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Versão Atual", prompt_stats["current_version"])
+    with col2:
+        st.metric("Total de Versões", prompt_stats["total_versions"])
+    with col3:
+        st.metric("Feedbacks Recebidos", prompt_stats["total_feedbacks"])
+    
+    st.markdown("---")
+    st.markdown("#### Prompt em Uso:")
+    st.code(current_prompt, language="markdown")
+    
+    st.markdown("---")
+    st.markdown("#### Histórico de Versões:")
+    
+    history = _cached_prompt_history(
+        prompt_stats["total_versions"], prompt_stats["total_feedbacks"]
+    )
+    for prompt_data in reversed(history):
+        with st.expander(
+            f"Versão {prompt_data['version']} - "
+            f"{prompt_data['timestamp'][:10]} - "
+            f"{prompt_data['feedback_count']} feedbacks"
+        ):
+            st.markdown("**Melhorias aplicadas:**")
+            for imp in prompt_data.get("improvements", []):
+                st.markdown(f"- {imp}")
+            
+            st.markdown("**Prompt:**")
+            st.code(prompt_data["prompt"], language="markdown")
+
+
+@st.fragment
+def render_feedback_area():
+    """Renderiza área de feedback e melhorias"""
+    st.html('<div class="main-header">Feedback e Melhorias</div>')
+    st.html('<div class="sub-header">Ajude a melhorar o assistente com seu feedback</div>')
+    
+    # Tabs para organizar conteúdo
+    tab1, tab2, tab3, tab4 = st.tabs(["Dar Feedback", "Histórico Feedbacks", "Histórico Conversas", "Prompt Atual"])
+    
+    with tab1:
+        _render_feedback_form_tab()
+    
+    with tab2:
+        _render_feedback_history_tab()
+    
+    with tab3:
+        _render_conversation_history_tab()
+    
+    with tab4:
+        _render_prompt_tab()
+
 
 def main():
     """Função principal da aplicação"""
+    st.html(load_css(CSS_FILE))
+    
     # Inicializa sessão
     initialize_session()
     
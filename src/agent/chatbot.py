@@ -2,17 +2,218 @@
 Chatbot principal com integração de LLM, ferramentas e vector store
 """
 
+import asyncio
+import hashlib
+import json
 import logging
-from typing import List, Dict, Optional
+import re
+import string
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cached_property
+from itertools import islice
+from typing import List, Dict, Optional, Tuple, Iterator, AsyncIterator, Deque
 import google.generativeai as genai
+from google.generativeai import caching
 from google.generativeai.types import content_types
 
-from ..tools import ViaCEPTool, PokemonTool, IBGETool, OpenMeteoTool, TVMazeTool, OpenLibraryTool, LyricsOvhTool
+from ..tools import (
+    ViaCEPTool, PokemonTool, IBGETool, OpenMeteoTool, TVMazeTool, OpenLibraryTool, LyricsOvhTool,
+    get_session
+)
 from ..vectorstore import ChromaVectorStore
 from .prompt_manager import PromptManager
 
 logger = logging.getLogger(__name__)
 
+# Máximo de mensagens mantidas no histórico (as mais antigas são descartadas)
+MAX_HISTORY = 200
+
+# Mensagens enviadas literalmente no prompt; as anteriores viram um resumo incremental
+RECENT_HISTORY_MESSAGES = 5
+
+# Mensagens anteriores às recentes acumuladas antes de atualizar o resumo (uma chamada ao
+# modelo a cada 2 turnos, em vez de uma por turno); até lá não entram no prompt
+SUMMARY_BATCH_MESSAGES = 4
+
+# Papel da entrada de histórico que guarda o resumo das mensagens antigas
+SUMMARY_ROLE = "summary"
+
+# Validade (segundos) e capacidade do cache de resultados das ferramentas
+TOOL_CACHE_TTL = 3600
+TOOL_CACHE_SIZE = 1024
+
+# Validade (segundos) para ferramentas cujos dados mudam antes de TOOL_CACHE_TTL
+TOOL_CACHE_TTL_BY_FUNCTION = {
+    "consultar_clima": 300  # Condições atuais: só evita repetir a consulta na mesma conversa
+}
+
+# Caracteres removidos do CEP ao comparar chamadas de ferramenta
+_NON_DIGIT_RE = re.compile(r'\D')
+
+# Rótulo de cada papel ao transcrever o histórico no prompt
+_ROLE_LABEL = {"user": "Usuário", "assistant": "Assistente"}
+
+# Templates fixos dos prompts auxiliares (interpretados uma vez, na importação)
+_TOOLS_PROMPT = string.Template("""$full_message
+
+RESULTADOS DAS FERRAMENTAS:
+$tools_output
+
+Agora responda ao usuário de forma natural, incorporando essas informações:""")
+
+_SUMMARY_PROMPT = string.Template("""Atualize o resumo de uma conversa incorporando as novas mensagens.
+Responda apenas com o resumo atualizado, em no máximo 5 frases.
+
+RESUMO ATUAL:
+$summary
+
+NOVAS MENSAGENS:
+$turns""")
+
+_BATCH_PROMPT = string.Template("""$system_prompt
+
+Responda a cada uma das mensagens abaixo de forma independente, usando o contexto que
+acompanha uma mensagem só para respondê-la. Retorne apenas um array JSON de strings, com
+exatamente uma resposta por mensagem, na mesma ordem:
+
+$messages""")
+
+# Validade (segundos) do cache de contexto do Gemini com o system prompt e as ferramentas
+PROMPT_CACHE_TTL = 3600
+
+# Antecedência (segundos) com que o cache de contexto é renovado antes de expirar
+PROMPT_CACHE_REFRESH_MARGIN = 300
+
+# Tempo (segundos) que um cache de contexto substituído ainda atende requisições em
+# andamento (o Chatbot é compartilhado entre sessões) antes de ser removido no servidor
+PROMPT_CACHE_RETIRE_DELAY = 120
+
+# Máximo de mensagens respondidas por chamada em chat_batch (prompts maiores degradam as respostas)
+MAX_BATCH_SIZE = 8
+
+# Quantidade de mensagens distintas com resultado da busca na base de conhecimento em cache
+CONTEXT_CACHE_SIZE = 256
+
+# Declarações das funções para o Gemini (formato correto); imutáveis, montadas uma vez
+_TOOL_SCHEMAS = [
+    genai.protos.FunctionDeclaration(
+        name="consultar_cep",
+        description="Consulta informações de endereço a partir de um CEP brasileiro. Use quando o usuário mencionar CEP, endereço, ou fornecer um código postal de 8 dígitos.",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={
+                "cep": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="CEP brasileiro com 8 dígitos (pode ter hífen ou não). Exemplo: 01310-100 ou 01310100"
+                )
+            },
+            required=["cep"]
+        )
+    ),
+    genai.protos.FunctionDeclaration(
+        name="consultar_pokemon",
+        description="Consulta informações sobre um Pokémon específico da PokéAPI. Use quando o usuário perguntar sobre Pokémon, mencionar nomes de Pokémon ou números da Pokédex.",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={
+                "identificador": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="Nome do Pokémon (em inglês minúsculo, ex: 'pikachu') ou número da Pokédex (ex: '25')"
+                )
+            },
+            required=["identificador"]
+        )
+    ),
+    genai.protos.FunctionDeclaration(
+        name="consultar_ibge",
+        description="Consulta informações geográficas do Brasil via IBGE. Use quando o usuário perguntar sobre estados brasileiros, municípios, cidades, regiões ou siglas de UF.",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={
+                "consulta": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="Nome do estado (ex: 'São Paulo' ou 'SP'), município (ex: 'Campinas' ou 'Campinas/SP') ou sigla da UF (ex: 'RJ')"
+                )
+            },
+            required=["consulta"]
+        )
+    ),
+    genai.protos.FunctionDeclaration(
+        name="consultar_clima",
+        description="Consulta informações de clima atual e previsão do tempo. Use quando o usuário perguntar sobre clima, tempo, temperatura, previsão meteorológica.",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={
+                "local": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="Nome da cidade ou localização (ex: 'São Paulo', 'New York', 'Tokyo', 'Paris')"
+                )
+            },
+            required=["local"]
+        )
+    ),
+    genai.protos.FunctionDeclaration(
+        name="consultar_serie",
+        description="Consulta informações sobre séries de TV. Use quando o usuário perguntar sobre séries, programas de TV, shows.",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={
+                "nome": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="Nome da série de TV (ex: 'Breaking Bad', 'Game of Thrones', 'The Office', 'Stranger Things')"
+                )
+            },
+            required=["nome"]
+        )
+    ),
+    genai.protos.FunctionDeclaration(
+        name="consultar_livro",
+        description="Consulta informações sobre livros. Use quando o usuário perguntar sobre livros, obras literárias, autores, ISBN.",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={
+                "consulta": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="Nome do livro ou autor (ex: '1984', 'Harry Potter', 'Machado de Assis', 'The Great Gatsby')"
+                )
+            },
+            required=["consulta"]
+        )
+    ),
+    genai.protos.FunctionDeclaration(
+        name="consultar_letra_musica",
+        description="Consulta letras de músicas. Use quando o usuário perguntar sobre letras de músicas, pedir para ver a letra de uma música específica.",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={
+                "artista": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="Nome do artista ou banda (ex: 'Coldplay', 'The Beatles', 'Legião Urbana', 'Queen')"
+                ),
+                "musica": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="Nome da música (ex: 'Yellow', 'Hey Jude', 'Bohemian Rhapsody')"
+                )
+            },
+            required=["artista", "musica"]
+        )
+    )
+]
+
+
+# Despacho das function calls: nome da função -> (ferramenta, argumentos, rótulo para log)
+_FUNCTION_DISPATCH = {
+    "consultar_cep": ("viacep", ("cep",), "ViaCEP"),
+    "consultar_pokemon": ("pokemon", ("identificador",), "Pokemon"),
+    "consultar_ibge": ("ibge", ("consulta",), "IBGE"),
+    "consultar_clima": ("clima", ("local",), "Clima"),
+    "consultar_serie": ("serie", ("nome",), "Série"),
+    "consultar_livro": ("livro", ("consulta",), "Livro"),
+    "consultar_letra_musica": ("letra", ("artista", "musica"), "Letra"),
+}
 
 class Chatbot:
     """Agente conversacional com IA e ferramentas externas"""
@@ -28,122 +229,15 @@ class Chatbot:
         # Configura Gemini
         genai.configure(api_key=api_key)
         
-        # Inicializa ferramentas
-        self.tools_instances = {
-            "viacep": ViaCEPTool(),
-            "pokemon": PokemonTool(),
-            "ibge": IBGETool(),
-            "clima": OpenMeteoTool(),
-            "serie": TVMazeTool(),
-            "livro": OpenLibraryTool(),
-            "letra": LyricsOvhTool()
-        }
+        # Sessão HTTP única das ferramentas (conexões reaproveitadas entre chamadas)
+        self._http = get_session()
         
-        # Define funções para o Gemini (formato correto)
-        self.tools = [
-            genai.protos.FunctionDeclaration(
-                name="consultar_cep",
-                description="Consulta informações de endereço a partir de um CEP brasileiro. Use quando o usuário mencionar CEP, endereço, ou fornecer um código postal de 8 dígitos.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "cep": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="CEP brasileiro com 8 dígitos (pode ter hífen ou não). Exemplo: 01310-100 ou 01310100"
-                        )
-                    },
-                    required=["cep"]
-                )
-            ),
-            genai.protos.FunctionDeclaration(
-                name="consultar_pokemon",
-                description="Consulta informações sobre um Pokémon específico da PokéAPI. Use quando o usuário perguntar sobre Pokémon, mencionar nomes de Pokémon ou números da Pokédex.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "identificador": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Nome do Pokémon (em inglês minúsculo, ex: 'pikachu') ou número da Pokédex (ex: '25')"
-                        )
-                    },
-                    required=["identificador"]
-                )
-            ),
-            genai.protos.FunctionDeclaration(
-                name="consultar_ibge",
-                description="Consulta informações geográficas do Brasil via IBGE. Use quando o usuário perguntar sobre estados brasileiros, municípios, cidades, regiões ou siglas de UF.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "consulta": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Nome do estado (ex: 'São Paulo' ou 'SP'), município (ex: 'Campinas') ou sigla da UF (ex: 'RJ')"
-                        )
-                    },
-                    required=["consulta"]
-                )
-            ),
-            genai.protos.FunctionDeclaration(
-                name="consultar_clima",
-                description="Consulta informações de clima atual e previsão do tempo. Use quando o usuário perguntar sobre clima, tempo, temperatura, previsão meteorológica.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "local": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Nome da cidade ou localização (ex: 'São Paulo', 'New York', 'Tokyo', 'Paris')"
-                        )
-                    },
-                    required=["local"]
-                )
-            ),
-            genai.protos.FunctionDeclaration(
-                name="consultar_serie",
-                description="Consulta informações sobre séries de TV. Use quando o usuário perguntar sobre séries, programas de TV, shows.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "nome": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Nome da série de TV (ex: 'Breaking Bad', 'Game of Thrones', 'The Office', 'Stranger Things')"
-                        )
-                    },
-                    required=["nome"]
-                )
-            ),
-            genai.protos.FunctionDeclaration(
-                name="consultar_livro",
-                description="Consulta informações sobre livros. Use quando o usuário perguntar sobre livros, obras literárias, autores, ISBN.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "consulta": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Nome do livro ou autor (ex: '1984', 'Harry Potter', 'Machado de Assis', 'The Great Gatsby')"
-                        )
-                    },
-                    required=["consulta"]
-                )
-            ),
-            genai.protos.FunctionDeclaration(
-                name="consultar_letra_musica",
-                description="Consulta letras de músicas. Use quando o usuário perguntar sobre letras de músicas, pedir para ver a letra de uma música específica.",
-                parameters=genai.protos.Schema(
-                    type=genai.protos.Type.OBJECT,
-                    properties={
-                        "artista": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Nome do artista ou banda (ex: 'Coldplay', 'The Beatles', 'Legião Urbana', 'Queen')"
-                        ),
-                        "musica": genai.protos.Schema(
-                            type=genai.protos.Type.STRING,
-                            description="Nome da música (ex: 'Yellow', 'Hey Jude', 'Bohemian Rhapsody')"
-                        )
-                    },
-                    required=["artista", "musica"]
-                )
-            )
-        ]
+        # Ferramentas, prompt manager e vector store são criados no primeiro uso
+        self._data_dir = data_dir
+        self._lazy_lock = threading.Lock()
+        
+        # Define funções para o Gemini (compartilhadas entre instâncias)
+        self.tools = _TOOL_SCHEMAS
         
         # Inicializa modelo com function calling
         self.model = genai.GenerativeModel(
@@ -151,16 +245,77 @@ class Chatbot:
             tools=self.tools
         )
         
-        # Inicializa componentes
-        self.prompt_manager = PromptManager(data_dir)
-        self.vector_store = ChromaVectorStore(f"{data_dir}/chroma")
+        # Modelo sem ferramentas para a resposta final após as function calls
+        self.answer_model = genai.GenerativeModel('gemini-2.5-flash')
+        
+        # Histórico da conversa atual (limitado a MAX_HISTORY mensagens)
+        self.chat_history: Deque[Dict[str, str]] = deque(maxlen=MAX_HISTORY)
+        self._user_msg_count = 0
         
-        # Histórico da conversa atual
-        self.chat_history: List[Dict[str, str]] = []
+        # Pool para operações de I/O independentes (buscas no vector store e ferramentas)
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chatbot-io")
+        
+        # Gravações no vector store ficam fora do caminho da resposta (em ordem, uma por vez)
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chatbot-write")
+        
+        # Atualizações de resumo rodam em fila única: nunca duas sobre o mesmo resumo
+        self._summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chatbot-summary")
+        
+        # Cache de contexto do Gemini (system prompt + ferramentas), criado em segundo plano
+        self._prompt_cache: Optional[Dict] = None
+        self._prompt_cache_pending = False
+        self._prompt_cache_lock = threading.Lock()
+        self._retired_prompt_caches: List[Tuple[float, object]] = []  # (remover_em, CachedContent)
+        
+        # Cache LRU com validade dos resultados das ferramentas, por chamada normalizada
+        self._tool_cache: OrderedDict = OrderedDict()
+        self._tool_cache_lock = threading.Lock()
+        
+        # Cache LRU das buscas na base de conhecimento, por mensagem normalizada
+        self._context_cache: OrderedDict = OrderedDict()
+        self._context_cache_lock = threading.Lock()
         
         logger.info("Chatbot inicializado com function calling")
     
-    def _execute_function_call(self, function_name: str, function_args: Dict) -> str:
+    def _create_once(self, name: str, factory):
+        """
+        Cria um componente preguiçoso uma única vez, mesmo com acessos simultâneos
+        
+        Args:
+            name: Nome do atributo (a cached_property que guarda o componente)
+            factory: Função sem argumentos que constrói o componente
+        """
+        with self._lazy_lock:
+            # Outra thread pode ter criado o componente enquanto esta aguardava
+            if name not in self.__dict__:
+                # Grava ainda dentro do lock: a cached_property só gravaria depois de liberá-lo
+                self.__dict__[name] = factory()
+            return self.__dict__[name]
+    
+    @cached_property
+    def tools_instances(self) -> Dict:
+        """Ferramentas externas, indexadas pela chave usada em _FUNCTION_DISPATCH"""
+        return self._create_once("tools_instances", lambda: {
+            "viacep": ViaCEPTool(self._http),
+            "pokemon": PokemonTool(self._http),
+            "ibge": IBGETool(self._http),
+            "clima": OpenMeteoTool(self._http),
+            "serie": TVMazeTool(self._http),
+            "livro": OpenLibraryTool(self._http),
+            "letra": LyricsOvhTool(self._http)
+        })
+    
+    @cached_property
+    def prompt_manager(self) -> PromptManager:
+        """Gerenciador de versões do prompt"""
+        return self._create_once("prompt_manager", lambda: PromptManager(self._data_dir))
+    
+    @cached_property
+    def vector_store(self) -> ChromaVectorStore:
+        """Vector store (abre o banco e o modelo de embeddings no primeiro uso)"""
+        return self._create_once("vector_store", lambda: ChromaVectorStore(f"{self._data_dir}/chroma"))
+    
+    def _execute_function_call(self, function_name: str, function_args: Dict) -> Tuple[str, bool]:
         """
         Executa uma função chamada pelo modelo
         
@@ -169,85 +324,154 @@ class Chatbot:
             function_args: Argumentos da função
             
         Returns:
-            String com resultado formatado
+            Tupla (resultado_formatado, sucesso); só resultados com sucesso vão para o cache
         """
+        dispatch = _FUNCTION_DISPATCH.get(function_name)
+        if dispatch is None:
+            logger.warning(f"Função desconhecida: {function_name}")
+            return f"Função '{function_name}' não reconhecida", False
+        
+        tool_key, arg_names, label = dispatch
         try:
-            if function_name == "consultar_cep":
-                cep = function_args.get("cep", "")
-                result = self.tools_instances["viacep"].execute(cep)
-                formatted = self.tools_instances["viacep"].format_result(result)
-                logger.info(f"Function calling: ViaCEP executada para {cep}")
-                return formatted
-                
-            elif function_name == "consultar_pokemon":
-                identificador = function_args.get("identificador", "")
-                result = self.tools_instances["pokemon"].execute(identificador)
-                formatted = self.tools_instances["pokemon"].format_result(result)
-                logger.info(f"Function calling: Pokemon executada para {identificador}")
-                return formatted
-                
-            elif function_name == "consultar_ibge":
-                consulta = function_args.get("consulta", "")
-                result = self.tools_instances["ibge"].execute(consulta)
-                formatted = self.tools_instances["ibge"].format_result(result)
-                logger.info(f"Function calling: IBGE executada para {consulta}")
-                return formatted
-            
-            elif function_name == "consultar_clima":
-                local = function_args.get("local", "")
-                result = self.tools_instances["clima"].execute(local)
-                formatted = self.tools_instances["clima"].format_result(result)
-                logger.info(f"Function calling: Clima executada para {local}")
-                return formatted
-            
-            elif function_name == "consultar_serie":
-                nome = function_args.get("nome", "")
-                result = self.tools_instances["serie"].execute(nome)
-                formatted = self.tools_instances["serie"].format_result(result)
-                logger.info(f"Function calling: Série executada para {nome}")
-                return formatted
-            
-            elif function_name == "consultar_livro":
-                consulta = function_args.get("consulta", "")
-                result = self.tools_instances["livro"].execute(consulta)
-                formatted = self.tools_instances["livro"].format_result(result)
-                logger.info(f"Function calling: Livro executada para {consulta}")
-                return formatted
-            
-            elif function_name == "consultar_letra_musica":
-                artista = function_args.get("artista", "")
-                musica = function_args.get("musica", "")
-                result = self.tools_instances["letra"].execute(artista, musica)
-                formatted = self.tools_instances["letra"].format_result(result)
-                logger.info(f"Function calling: Letra executada para {artista} - {musica}")
-                return formatted
-            
-            else:
-                logger.warning(f"Função desconhecida: {function_name}")
-                return f"Função '{function_name}' não reconhecida"
-                
+            args = [function_args.get(arg_name, "") for arg_name in arg_names]
+            tool = self.tools_instances[tool_key]
+            result = tool.execute(*args)
+            formatted = tool.format_result(result)
+            logger.info(f"Function calling: {label} executada para {' - '.join(map(str, args))}")
+            return formatted, not result.get("error", False)
         except Exception as e:
             logger.error(f"Erro ao executar função {function_name}: {e}")
-            return f"Erro ao executar {function_name}: {str(e)}"
+            return f"Erro ao executar {function_name}: {str(e)}", False
+    
+    @staticmethod
+    def _tool_call_key(function_name: str, function_args: Dict) -> Tuple:
+        """Chave de uma chamada: argumentos sem espaços nas pontas, em minúsculas e CEP só com dígitos"""
+        dispatch = _FUNCTION_DISPATCH.get(function_name)
+        arg_names = dispatch[1] if dispatch else tuple(sorted(function_args))
+        
+        values = []
+        for arg_name in arg_names:
+            value = str(function_args.get(arg_name, "")).strip().lower()
+            if arg_name == "cep":
+                value = _NON_DIGIT_RE.sub('', value)
+            values.append(value)
+        return (function_name, *values)
     
-    def _get_context_from_vectorstore(self, user_message: str) -> str:
+    def _submit_function_call(self, function_name: str, function_args: Dict) -> Future:
+        """
+        Dispara uma function call no pool, reaproveitando chamadas equivalentes
+        
+        Chamadas com a mesma chave normalizada compartilham o mesmo Future: repetições
+        no mesmo turno não geram outra requisição e resultados bem-sucedidos são
+        reaproveitados por TOOL_CACHE_TTL segundos (ou pelo valor da ferramenta em
+        TOOL_CACHE_TTL_BY_FUNCTION).
+        
+        Returns:
+            Future com a tupla (resultado_formatado, sucesso)
+        """
+        key = self._tool_call_key(function_name, function_args)
+        now = time.monotonic()
+        
+        with self._tool_cache_lock:
+            cached = self._tool_cache.get(key)
+            if cached is not None and now < cached[0]:
+                self._tool_cache.move_to_end(key)
+                logger.info(f"Function call {function_name} reaproveitada: {function_args}")
+                return cached[1]
+            
+            future = self._executor.submit(self._execute_function_call, function_name, function_args)
+            ttl = TOOL_CACHE_TTL_BY_FUNCTION.get(function_name, TOOL_CACHE_TTL)
+            self._tool_cache[key] = (now + ttl, future)
+            self._tool_cache.move_to_end(key)
+            if len(self._tool_cache) > TOOL_CACHE_SIZE:
+                self._tool_cache.popitem(last=False)
+        
+        future.add_done_callback(lambda done: self._forget_failed_call(key, done))
+        return future
+    
+    def _forget_failed_call(self, key: Tuple, future: Future):
+        """Remove do cache uma chamada que falhou, para que seja refeita no próximo pedido"""
+        if future.exception() is None and future.result()[1]:
+            return
+        with self._tool_cache_lock:
+            cached = self._tool_cache.get(key)
+            if cached is not None and cached[1] is future:
+                del self._tool_cache[key]
+    
+    @staticmethod
+    def _search_result(future: Future, label: str) -> List[Dict]:
+        """Retorna o resultado de uma busca em paralelo (lista vazia em caso de erro)"""
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"Erro na busca de {label}: {e}")
+            return []
+    
+    @staticmethod
+    def _context_cache_key(user_message: str) -> bytes:
+        """Chave do cache de contexto: hash da mensagem sem espaços nas pontas e em minúsculas"""
+        return hashlib.blake2b(user_message.strip().lower().encode("utf-8"), digest_size=16).digest()
+    
+    def _start_context_search(self, user_message: str) -> Tuple[Future, Future]:
+        """
+        Dispara em paralelo as buscas no vector store (conhecimento e conversas similares)
+        
+        Mensagens repetidas reaproveitam o resultado em cache da base de conhecimento,
+        que não muda durante a execução. A busca de conversas similares sempre roda:
+        cada turno de qualquer sessão grava uma conversa nova no vector store.
+        
+        Args:
+            user_message: Mensagem do usuário
+            
+        Returns:
+            Tupla (future_conhecimento, future_conversas_similares)
+        """
+        cache_key = self._context_cache_key(user_message)
+        with self._context_cache_lock:
+            cached = self._context_cache.get(cache_key)
+            if cached is not None:
+                self._context_cache.move_to_end(cache_key)
+        
+        if cached is not None:
+            knowledge_future = Future()
+            knowledge_future.set_result(cached)
+        else:
+            knowledge_future = self._executor.submit(
+                self.vector_store.search_knowledge, user_message, n_results=2
+            )
+        similar_future = self._executor.submit(
+            self.vector_store.search_similar_conversations, user_message, n_results=1
+        )
+        return knowledge_future, similar_future
+    
+    def _get_context_from_vectorstore(self, user_message: str,
+                                      searches: Optional[Tuple[Future, Future]] = None) -> str:
         """
         Busca contexto relevante no vector store
         
         Args:
             user_message: Mensagem do usuário
+            searches: Buscas já disparadas por _start_context_search (opcional)
             
         Returns:
             String com contexto relevante
         """
         try:
-            # Busca conhecimento relevante
-            knowledge = self.vector_store.search_knowledge(user_message, n_results=2)
+            # As duas buscas são independentes: executam em paralelo
+            if searches is None:
+                searches = self._start_context_search(user_message)
+            knowledge_future, similar_future = searches
+            knowledge = self._search_result(knowledge_future, "conhecimento")
+            similar_convs = self._search_result(similar_future, "conversas similares")
             
-            # Busca conversas similares
-            similar_convs = self.vector_store.search_similar_conversations(
-                user_message, n_results=1
-            )
+            # Só guarda em cache buscas que não falharam
+            if knowledge_future.exception() is None:
+                with self._context_cache_lock:
+                    cache_key = self._context_cache_key(user_message)
+                    self._context_cache[cache_key] = knowledge
+                    self._context_cache.move_to_end(cache_key)
+                    if len(self._context_cache) > CONTEXT_CACHE_SIZE:
+                        self._context_cache.popitem(last=False)
             
             context_parts = []
             
@@ -269,131 +493,549 @@ class Chatbot:
             logger.error(f"Erro ao buscar contexto: {e}")
             return ""
     
-    def chat(self, user_message: str) -> Dict:
+    def _build_full_message(self, user_message: str, history: List[Dict[str, str]]) -> Tuple[str, str]:
         """
-        Processa mensagem do usuário e gera resposta usando function calling
+        Monta o prompt completo enviado ao modelo
         
         Args:
             user_message: Mensagem do usuário
+            history: Histórico da conversa do usuário
             
         Returns:
-            Dicionário com resposta e informações adicionais
+            Tupla (prompt_completo, contexto_do_vector_store)
         """
+        # Dispara a busca no vector store; prompt e histórico são preparados enquanto isso
+        searches = self._start_context_search(user_message)
+        
+        # Constrói prompt completo
+        system_prompt = self.prompt_manager.get_current_prompt()
+        
+        # Prepara histórico de conversa: resumo das mensagens antigas + mensagens recentes
+        summary = history[0]["content"] if history and history[0]["role"] == SUMMARY_ROLE else ""
+        recent = islice(history, max(0, len(history) - RECENT_HISTORY_MESSAGES), None)
+        history_text = "\n".join(
+            f"{_ROLE_LABEL[msg['role']]}: {msg['content']}"
+            for msg in recent if msg["role"] != SUMMARY_ROLE
+        )
+        if summary:
+            history_text = f"Resumo da conversa até aqui: {summary}\n{history_text}"
+        
+        # Aguarda o contexto do vector store
+        vector_context = self._get_context_from_vectorstore(user_message, searches)
+        
+        # Monta prompt com contexto, só com as seções que têm conteúdo
+        parts = [system_prompt]
+        if vector_context:
+            parts.append(f"CONTEXTO DA BASE DE CONHECIMENTO:\n{vector_context}")
+        if history_text:
+            parts.append(f"HISTÓRICO RECENTE:\n{history_text}")
+        parts.append(f"MENSAGEM DO USUÁRIO:\n{user_message}")
+        full_message = "\n\n".join(parts)
+        
+        return full_message, vector_context
+    
+    def _refresh_prompt_cache(self, system_prompt: str):
+        """Cria no Gemini o cache de contexto com o system prompt e as ferramentas"""
         try:
-            # Busca contexto no vector store
-            vector_context = self._get_context_from_vectorstore(user_message)
+            cached_content = caching.CachedContent.create(
+                model='models/gemini-2.5-flash',
+                system_instruction=system_prompt,
+                tools=self.tools,
+                ttl=PROMPT_CACHE_TTL
+            )
+            model = genai.GenerativeModel.from_cached_content(cached_content)
+            logger.info(f"Cache de contexto criado para o prompt atual: {cached_content.name}")
+        except Exception as e:
+            # Ex.: prompt abaixo do mínimo de tokens exigido pela API para cache
+            logger.warning(f"Cache de contexto indisponível, usando o prompt completo: {e}")
+            cached_content = None
+            model = None
+        
+        created_at = time.monotonic()
+        with self._prompt_cache_lock:
+            previous = self._prompt_cache
+            self._prompt_cache = {
+                "prompt": system_prompt,
+                "model": model,
+                "content": cached_content,
+                "refresh_at": created_at + PROMPT_CACHE_TTL - PROMPT_CACHE_REFRESH_MARGIN,
+                "expires_at": created_at + PROMPT_CACHE_TTL
+            }
+            self._prompt_cache_pending = False
             
-            # Constrói prompt completo
-            system_prompt = self.prompt_manager.get_current_prompt()
+            # O cache substituído é cobrado até expirar, mas requisições que já o obtiveram
+            # podem estar em andamento: só é removido após PROMPT_CACHE_RETIRE_DELAY
+            # (se expirar antes disso, o próprio servidor o descarta)
+            retire_at = created_at + PROMPT_CACHE_RETIRE_DELAY
+            if previous is not None and previous["content"] is not None and retire_at < previous["expires_at"]:
+                self._retired_prompt_caches.append((retire_at, previous["content"]))
+    
+    @staticmethod
+    def _delete_prompt_cache(cached_content):
+        """Remove no servidor um cache de contexto que não é mais usado"""
+        try:
+            cached_content.delete()
+            logger.info(f"Cache de contexto anterior removido: {cached_content.name}")
+        except Exception as e:
+            logger.warning(f"Erro ao remover cache de contexto anterior: {e}")
+    
+    def _tools_request(self, full_message: str) -> Tuple[genai.GenerativeModel, str]:
+        """
+        Escolhe o modelo e o conteúdo da primeira chamada (com function calling)
+        
+        Com um cache de contexto válido para o prompt atual, usa o modelo ligado ao
+        cache e envia a mensagem sem o system prompt; senão usa self.model com o
+        prompt completo. Cache ausente, de outra versão do prompt ou perto de expirar
+        é (re)criado em segundo plano, sem atrasar a resposta.
+        
+        Args:
+            full_message: Prompt completo montado por _build_full_message
             
-            # Prepara histórico de conversa
-            history_text = "\n".join([
-                f"{'Usuário' if msg['role'] == 'user' else 'Assistente'}: {msg['content']}"
-                for msg in self.chat_history[-5:]
-            ])
+        Returns:
+            Tupla (modelo, conteúdo_a_enviar)
+        """
+        system_prompt = self.prompt_manager.get_current_prompt()
+        now = time.monotonic()
+        
+        with self._prompt_cache_lock:
+            cache = self._prompt_cache
+            stale = cache is None or cache["prompt"] != system_prompt or now >= cache["refresh_at"]
+            if stale and not self._prompt_cache_pending:
+                self._prompt_cache_pending = True
+                self._executor.submit(self._refresh_prompt_cache, system_prompt)
             
-            # Monta prompt com contexto
-            full_message = f"""{system_prompt}
-
-{f'CONTEXTO DA BASE DE CONHECIMENTO:{chr(10)}{vector_context}' if vector_context else ''}
-
-{f'HISTÓRICO RECENTE:{chr(10)}{history_text}' if history_text else ''}
-
-MENSAGEM DO USUÁRIO:
-{user_message}"""
+            due = [content for retire_at, content in self._retired_prompt_caches if now >= retire_at]
+            if due:
+                self._retired_prompt_caches = [
+                    (retire_at, content) for retire_at, content in self._retired_prompt_caches if now < retire_at
+                ]
+        
+        for cached_content in due:
+            self._executor.submit(self._delete_prompt_cache, cached_content)
+        
+        if (cache is not None and cache["model"] is not None and cache["prompt"] == system_prompt
+                and now < cache["expires_at"] and full_message.startswith(system_prompt)):
+            return cache["model"], full_message[len(system_prompt):].lstrip()
+        return self.model, full_message
+    
+    @staticmethod
+    def _get_parts(response) -> List:
+        """Retorna as partes do primeiro candidato de uma resposta (ou chunk) do Gemini"""
+        if response.candidates and response.candidates[0].content.parts:
+            return list(response.candidates[0].content.parts)
+        return []
+    
+    def _run_function_calls(self, function_calls: List) -> Tuple[List, str]:
+        """
+        Executa as function calls solicitadas pelo modelo
+        
+        Args:
+            function_calls: Lista de function calls retornadas pelo modelo
+            
+        Returns:
+            Tupla (ferramentas_usadas, saída_das_ferramentas)
+        """
+        calls = [(function_call.name, dict(function_call.args)) for function_call in function_calls]
+        for function_name, function_args in calls:
+            logger.info(f"Model solicitou function call: {function_name} com args {function_args}")
+        
+        # Cada ferramenta é uma chamada HTTP independente: várias rodam em paralelo
+        futures = [self._submit_function_call(*call) for call in calls]
+        results = [future.result()[0] for future in futures]
+        
+        tools_used = [(function_name, str(function_args)) for function_name, function_args in calls]
+        tools_output = "".join(result + "\n\n" for result in results)
+        
+        return tools_used, tools_output
+    
+    def _start_function_call(self, function_call) -> Tuple[Tuple[str, Dict], Future]:
+        """Dispara em segundo plano uma function call assim que o modelo a solicita"""
+        call = (function_call.name, dict(function_call.args))
+        logger.info(f"Model solicitou function call: {call[0]} com args {call[1]}")
+        return call, self._submit_function_call(*call)
+    
+    @staticmethod
+    def _collect_function_calls(started: List[Tuple[Tuple[str, Dict], Future]]) -> Tuple[List, str]:
+        """
+        Aguarda as function calls disparadas por _start_function_call
+        
+        Returns:
+            Tupla (ferramentas_usadas, saída_das_ferramentas), na ordem das chamadas
+        """
+        tools_used = [(function_name, str(function_args)) for (function_name, function_args), _ in started]
+        tools_output = "".join(future.result()[0] + "\n\n" for _, future in started)
+        return tools_used, tools_output
+    
+    def _build_tools_prompt(self, full_message: str, tools_output: str) -> str:
+        """Constrói mensagem da segunda chamada com os resultados das ferramentas"""
+        return _TOOLS_PROMPT.substitute(full_message=full_message, tools_output=tools_output)
+    
+    def _fold_history(self, history: List[Dict[str, str]]):
+        """
+        Mantém no histórico só as RECENT_HISTORY_MESSAGES mensagens mais recentes
+        
+        O prompt sempre leva só as RECENT_HISTORY_MESSAGES últimas mensagens; as
+        anteriores esperam até somarem SUMMARY_BATCH_MESSAGES e então são
+        incorporadas de uma vez, em segundo plano, à entrada de resumo (papel
+        SUMMARY_ROLE) no início do histórico, criada se ainda não existir.
+        """
+        messages = list(history)
+        if messages and messages[0]["role"] == SUMMARY_ROLE:
+            summary, messages = messages[0], messages[1:]
+        else:
+            summary = {"role": SUMMARY_ROLE, "content": ""}
+        
+        if len(messages) < RECENT_HISTORY_MESSAGES + SUMMARY_BATCH_MESSAGES:
+            return
+        
+        evicted = messages[:-RECENT_HISTORY_MESSAGES]
+        history.clear()
+        history.extend([summary] + messages[-RECENT_HISTORY_MESSAGES:])
+        self._summary_executor.submit(self._update_summary, summary, evicted)
+    
+    def _update_summary(self, summary: Dict[str, str], evicted: List[Dict[str, str]]):
+        """Incorpora ao resumo as mensagens que saíram do histórico recente"""
+        turns = "\n".join(f"{_ROLE_LABEL[msg['role']]}: {msg['content']}" for msg in evicted)
+        prompt = _SUMMARY_PROMPT.substitute(summary=summary["content"] or "(vazio)", turns=turns)
+        
+        try:
+            summary["content"] = self.answer_model.generate_content(prompt).text.strip()
+            logger.info(f"Resumo da conversa atualizado com {len(evicted)} mensagens")
+        except Exception as e:
+            logger.error(f"Erro ao atualizar resumo da conversa: {e}")
+    
+    def _finish_turn(self, user_message: str, agent_response: str, history: List[Dict[str, str]],
+                     tools_used: List, tools_output: str, vector_context: str) -> Dict:
+        """
+        Registra a interação no histórico e no vector store
+        
+        Returns:
+            Dicionário com resposta e informações adicionais
+        """
+        # Adiciona ao histórico
+        history.append({"role": "user", "content": user_message})
+        history.append({"role": "assistant", "content": agent_response})
+        if history is self.chat_history:
+            self._user_msg_count += 1
+        self._fold_history(history)
+        
+        # Salva no vector store em segundo plano (o resultado não é usado na resposta)
+        self._write_executor.submit(
+            self.vector_store.add_conversation,
+            user_message,
+            agent_response,
+            metadata={
+                "tools_used": [t[0] for t in tools_used],
+                "has_context": bool(vector_context)
+            }
+        )
+        
+        logger.info(f"Resposta gerada com sucesso (function calls: {len(tools_used)})")
+        
+        return {
+            "response": agent_response,
+            "tools_used": tools_used,
+            "has_tools_output": bool(tools_output),
+            "tools_output": tools_output.strip(),
+            "has_context": bool(vector_context)
+        }
+    
+    @staticmethod
+    def _error_result(error: Exception) -> Dict:
+        """Monta o dicionário de resposta para uma falha no processamento"""
+        return {
+            "response": f"Desculpe, ocorreu um erro ao processar sua mensagem: {str(error)}",
+            "tools_used": [],
+            "has_tools_output": False,
+            "tools_output": "",
+            "has_context": False,
+            "error": str(error)
+        }
+    
+    def chat(self, user_message: str, history: Optional[List[Dict[str, str]]] = None) -> Dict:
+        """
+        Processa mensagem do usuário e gera resposta usando function calling
+        
+        Args:
+            user_message: Mensagem do usuário
+            history: Histórico da conversa do usuário (opcional, usa o interno se omitido)
+            
+        Returns:
+            Dicionário com resposta e informações adicionais
+        """
+        if history is None:
+            history = self.chat_history
+        
+        try:
+            full_message, vector_context = self._build_full_message(user_message, history)
             
             # Primeira chamada ao modelo (pode retornar function calls)
-            response = self.model.generate_content(full_message)
+            model, contents = self._tools_request(full_message)
+            response = model.generate_content(contents)
             
             # Verifica se há function calls
-            tools_used = []
-            tools_output = ""
-            
-            if response.candidates and response.candidates[0].content.parts:
-                for part in response.candidates[0].content.parts:
-                    # Se há function call
-                    if hasattr(part, 'function_call') and part.function_call:
-                        function_call = part.function_call
-                        function_name = function_call.name
-                        function_args = dict(function_call.args)
-                        
-                        logger.info(f"Model solicitou function call: {function_name} com args {function_args}")
-                        
-                        # Executa a função
-                        function_result = self._execute_function_call(function_name, function_args)
-                        tools_output += function_result + "\n\n"
-                        tools_used.append((function_name, str(function_args)))
+            function_calls = [
+                part.function_call for part in self._get_parts(response)
+                if hasattr(part, 'function_call') and part.function_call
+            ]
+            tools_used, tools_output = self._run_function_calls(function_calls)
             
             # Se houve function calls, faz segunda chamada com os resultados
             if tools_used:
-                # Constrói mensagem com resultados das ferramentas
-                second_prompt = f"""{full_message}
-
-RESULTADOS DAS FERRAMENTAS:
-{tools_output}
-
-Agora responda ao usuário de forma natural, incorporando essas informações:"""
+                second_prompt = self._build_tools_prompt(full_message, tools_output)
                 
                 # Segunda chamada ao modelo sem function calling
-                model_no_tools = genai.GenerativeModel('gemini-2.5-flash')
-                final_response = model_no_tools.generate_content(second_prompt)
+                final_response = self.answer_model.generate_content(second_prompt)
                 agent_response = final_response.text
             else:
                 # Não houve function calls, usa resposta direta
                 agent_response = response.text if hasattr(response, 'text') else "Desculpe, não consegui processar sua mensagem."
             
-            # Adiciona ao histórico
-            self.chat_history.append({"role": "user", "content": user_message})
-            self.chat_history.append({"role": "assistant", "content": agent_response})
-            
-            # Salva no vector store
-            self.vector_store.add_conversation(
-                user_message,
-                agent_response,
-                metadata={
-                    "tools_used": [t[0] for t in tools_used],
-                    "has_context": bool(vector_context)
-                }
+            return self._finish_turn(
+                user_message, agent_response, history, tools_used, tools_output, vector_context
             )
             
-            logger.info(f"Resposta gerada com sucesso (function calls: {len(tools_used)})")
+        except Exception as e:
+            logger.error(f"Erro ao processar mensagem: {e}")
+            return self._error_result(e)
+    
+    def chat_stream(self, user_message: str, history: Optional[List[Dict[str, str]]] = None,
+                    result: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Versão em streaming de chat(): entrega a resposta em trechos à medida que é gerada
+        
+        Args:
+            user_message: Mensagem do usuário
+            history: Histórico da conversa do usuário (opcional, usa o interno se omitido)
+            result: Dicionário preenchido ao final com os mesmos campos retornados por chat()
             
-            return {
-                "response": agent_response,
-                "tools_used": tools_used,
-                "has_tools_output": bool(tools_output),
-                "tools_output": tools_output.strip(),
-                "has_context": bool(vector_context)
-            }
+        Yields:
+            Trechos de texto da resposta
+        """
+        if history is None:
+            history = self.chat_history
+        if result is None:
+            result = {}
+        
+        try:
+            full_message, vector_context = self._build_full_message(user_message, history)
+            
+            # Primeira chamada em streaming: texto é repassado e cada function call já é
+            # executada em segundo plano enquanto o restante da resposta chega
+            text_chunks = []
+            started_calls = []
+            model, contents = self._tools_request(full_message)
+            for chunk in model.generate_content(contents, stream=True):
+                for part in self._get_parts(chunk):
+                    if hasattr(part, 'function_call') and part.function_call:
+                        started_calls.append(self._start_function_call(part.function_call))
+                    elif part.text:
+                        text_chunks.append(part.text)
+                        yield part.text
+            
+            tools_used, tools_output = self._collect_function_calls(started_calls)
+            
+            # Se houve function calls, transmite a segunda chamada com os resultados
+            if tools_used:
+                second_prompt = self._build_tools_prompt(full_message, tools_output)
+                for chunk in self.answer_model.generate_content(second_prompt, stream=True):
+                    for part in self._get_parts(chunk):
+                        if part.text:
+                            text_chunks.append(part.text)
+                            yield part.text
+            
+            if not text_chunks:
+                fallback = "Desculpe, não consegui processar sua mensagem."
+                text_chunks.append(fallback)
+                yield fallback
+            
+            result.update(self._finish_turn(
+                user_message, "".join(text_chunks), history, tools_used, tools_output, vector_context
+            ))
             
         except Exception as e:
-            logger.error(f"Erro ao processar mensagem: {e}")
-            error_response = f"Desculpe, ocorreu um erro ao processar sua mensagem: {str(e)}"
-            
-            return {
-                "response": error_response,
-                "tools_used": [],
-                "has_tools_output": False,
-                "tools_output": "",
-                "has_context": False,
-                "error": str(e)
-            }
+            logger.error(f"Erro ao processar mensagem em streaming: {e}")
+            error_result = self._error_result(e)
+            result.update(error_result)
+            yield error_result["response"]
+    
+    async def achat_stream(self, user_message: str, history: Optional[List[Dict[str, str]]] = None,
+                           result: Optional[Dict] = None) -> AsyncIterator[str]:
+        """
+        Versão assíncrona de chat_stream(): usa a API async do Gemini e não bloqueia o event loop
+        
+        Buscas no vector store e execução de ferramentas (chamadas síncronas de I/O)
+        rodam em threads via asyncio.to_thread.
+        
+        Args:
+            user_message: Mensagem do usuário
+            history: Histórico da conversa do usuário (opcional, usa o interno se omitido)
+            result: Dicionário preenchido ao final com os mesmos campos retornados por chat()
+            
+        Yields:
+            Trechos de texto da resposta
+        """
+        if history is None:
+            history = self.chat_history
+        if result is None:
+            result = {}
+        
+        try:
+            full_message, vector_context = await asyncio.to_thread(
+                self._build_full_message, user_message, history
+            )
+            
+            # Primeira chamada em streaming: texto é repassado, function calls são acumuladas
+            text_chunks = []
+            function_calls = []
+            model, contents = self._tools_request(full_message)
+            response = await model.generate_content_async(contents, stream=True)
+            async for chunk in response:
+                for part in self._get_parts(chunk):
+                    if hasattr(part, 'function_call') and part.function_call:
+                        function_calls.append(part.function_call)
+                    elif part.text:
+                        text_chunks.append(part.text)
+                        yield part.text
+            
+            tools_used, tools_output = await asyncio.to_thread(self._run_function_calls, function_calls)
+            
+            # Se houve function calls, transmite a segunda chamada com os resultados
+            if tools_used:
+                second_prompt = self._build_tools_prompt(full_message, tools_output)
+                response = await self.answer_model.generate_content_async(second_prompt, stream=True)
+                async for chunk in response:
+                    for part in self._get_parts(chunk):
+                        if part.text:
+                            text_chunks.append(part.text)
+                            yield part.text
+            
+            if not text_chunks:
+                fallback = "Desculpe, não consegui processar sua mensagem."
+                text_chunks.append(fallback)
+                yield fallback
+            
+            result.update(await asyncio.to_thread(
+                self._finish_turn,
+                user_message, "".join(text_chunks), history, tools_used, tools_output, vector_context
+            ))
+            
+        except Exception as e:
+            logger.error(f"Erro ao processar mensagem em streaming assíncrono: {e}")
+            error_result = self._error_result(e)
+            result.update(error_result)
+            yield error_result["response"]
+    
+    def _answer_batch(self, batch: List[str], contexts: List[str]) -> Optional[List[str]]:
+        """
+        Responde um lote de mensagens independentes em uma única chamada ao modelo
+        
+        Args:
+            batch: Mensagens do usuário
+            contexts: Contexto do vector store de cada mensagem (vazio se não houver)
+        
+        Returns:
+            Lista de respostas na ordem das mensagens, ou None se a resposta do
+            modelo não for um array JSON com uma resposta por mensagem
+        """
+        numbered = "\n".join(
+            f"{i}. {message}" + (f"\n(Contexto da mensagem {i}:\n{context})" if context else "")
+            for i, (message, context) in enumerate(zip(batch, contexts), 1)
+        )
+        prompt = _BATCH_PROMPT.substitute(
+            system_prompt=self.prompt_manager.get_current_prompt(),
+            messages=numbered
+        )
+        
+        try:
+            response = self.answer_model.generate_content(
+                prompt,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            replies = json.loads(response.text)
+        except Exception as e:
+            logger.warning(f"Lote de {len(batch)} mensagens não respondido em uma chamada: {e}")
+            return None
+        
+        if not isinstance(replies, list) or len(replies) != len(batch):
+            logger.warning(f"Resposta do lote de {len(batch)} mensagens fora do formato esperado")
+            return None
+        
+        return [str(reply) for reply in replies]
+    
+    def chat_batch(self, messages: List[str], history: Optional[List[Dict[str, str]]] = None,
+                   batch_size: int = MAX_BATCH_SIZE) -> List[Dict]:
+        """
+        Responde várias mensagens independentes agrupando-as em poucas chamadas ao modelo
+        
+        Cada lote de até batch_size mensagens (limitado a MAX_BATCH_SIZE) é enviado em
+        um único prompt, com o contexto do vector store de cada mensagem, mas sem
+        function calling: mensagens que dependem de ferramentas devem usar chat(). Se a
+        resposta de um lote não puder ser interpretada, suas mensagens são processadas
+        uma a uma por chat().
+        
+        Args:
+            messages: Mensagens do usuário
+            history: Histórico da conversa do usuário (opcional, usa o interno se omitido)
+            batch_size: Quantidade de mensagens por chamada
+            
+        Returns:
+            Lista de dicionários de resposta, na mesma ordem das mensagens
+        """
+        if history is None:
+            history = self.chat_history
+        batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        
+        results = []
+        for start in range(0, len(messages), batch_size):
+            batch = messages[start:start + batch_size]
+            
+            # Buscas de todas as mensagens do lote disparadas juntas, antes de aguardar
+            searches = [self._start_context_search(message) for message in batch]
+            contexts = [
+                self._get_context_from_vectorstore(message, search)
+                for message, search in zip(batch, searches)
+            ]
+            
+            replies = self._answer_batch(batch, contexts)
+            if replies is None:
+                results.extend(self.chat(message, history) for message in batch)
+                continue
+            
+            for message, reply, context in zip(batch, replies, contexts):
+                results.append(self._finish_turn(message, reply, history, [], "", context))
+        
+        return results
+    
+    def close(self):
+        """Aguarda as gravações pendentes no vector store e encerra os pools de threads"""
+        self._write_executor.shutdown(wait=True)
+        self._summary_executor.shutdown(wait=True)
+        self._executor.shutdown(wait=True)
     
     def clear_history(self):
         """Limpa histórico da conversa atual"""
-        self.chat_history = []
+        self.chat_history.clear()
+        self._user_msg_count = 0
         logger.info("Histórico de conversa limpo")
     
     def get_history(self) -> List[Dict[str, str]]:
         """Retorna histórico da conversa"""
-        return self.chat_history.copy()
+        return list(self.chat_history)
     
-    def get_statistics(self) -> Dict:
-        """Retorna estatísticas do chatbot"""
-        user_messages = [msg for msg in self.chat_history if msg["role"] == "user"]
+    def get_statistics(self, messages_count: Optional[int] = None) -> Dict:
+        """
+        Retorna estatísticas do chatbot
+        
+        Args:
+            messages_count: Mensagens enviadas pelo usuário (opcional, usa o contador
+                do histórico interno se omitido)
+        """
+        if messages_count is None:
+            messages_count = self._user_msg_count
         
         return {
-            "messages_count": len(user_messages),
+            "messages_count": messages_count,
             "prompt_version": self.prompt_manager.get_current_version(),
             "vector_store": self.vector_store.get_statistics()
         }
\ No newline at end of file
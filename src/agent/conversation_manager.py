@@ -1,59 +1,316 @@
 """
 Gerenciador de Histórico de Conversas
 Salva todas as conversas automaticamente no histórico
+
+O histórico é um log JSONL somente-acréscimo (um evento por linha): gravar uma
+mensagem custa uma linha no fim do arquivo, não a regravação de todo o histórico.
 """
 
+import atexit
 import logging
 import json
+import sys
+import threading
+import time
+import weakref
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict
 import uuid
 
+from .. import jsonio
+
 logger = logging.getLogger(__name__)
 
+# Quantidade de mensagens acumuladas em memória antes de gravar no arquivo
+FLUSH_EVERY_MESSAGES = 8
+
+# Tempo máximo (segundos) que uma mensagem pendente espera até ser gravada
+FLUSH_INTERVAL_SECONDS = 0.25
+
+# Modos de gravação aceitos por ConversationManager (ver __init__)
+DURABILITY_MODES = ("per_message", "interval", "manual")
+
+# Eventos obsoletos (de sessões removidas ou histórico limpo) a partir dos quais o log é compactado
+COMPACT_MIN_STALE_EVENTS = 500
+
+# Gerenciadores ativos, para gravar mensagens pendentes quando o processo terminar
+_live_managers = weakref.WeakSet()
+
+
+def _flush_all_managers(include_manual: bool = True):
+    """
+    Grava as mensagens pendentes de todos os gerenciadores ativos
+    
+    Args:
+        include_manual: Se False, ignora gerenciadores em modo "manual" (gravador em segundo plano)
+    """
+    for manager in list(_live_managers):
+        if include_manual or manager.durability != "manual":
+            manager.flush()
+
+
+atexit.register(_flush_all_managers)
+
+# Sinaliza ao gravador em segundo plano que há mensagens pendentes
+_pending_event = threading.Event()
+_flusher_lock = threading.Lock()
+_flusher_thread = None
+
+
+def _flush_loop():
+    """Agrupa as mensagens pendentes e as grava a cada FLUSH_INTERVAL_SECONDS"""
+    while True:
+        _pending_event.wait()
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        _pending_event.clear()
+        _flush_all_managers(include_manual=False)
+
+
+def _schedule_flush():
+    """Agenda a gravação das pendências, iniciando o gravador na primeira vez"""
+    global _flusher_thread
+    with _flusher_lock:
+        if _flusher_thread is None:
+            _flusher_thread = threading.Thread(target=_flush_loop, name="conversations-flusher", daemon=True)
+            _flusher_thread.start()
+    _pending_event.set()
+
 
 class ConversationManager:
     """Gerencia histórico persistente de conversas em sessões"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", durability: str = "interval"):
         """
         Inicializa o gerenciador de conversas
         
+        Modos de gravação das mensagens (sessões criadas/removidas são gravadas na hora,
+        exceto em "manual"):
+        - "per_message": cada mensagem vai para o arquivo assim que adicionada; mais
+          escritas, nada se perde se o processo cair
+        - "interval": mensagens são agrupadas e gravadas a cada FLUSH_EVERY_MESSAGES ou
+          após FLUSH_INTERVAL_SECONDS; uma queda perde no máximo esse intervalo
+        - "manual": nada é gravado até flush() (ou o encerramento do processo); menos
+          escritas, mas uma queda perde tudo o que estiver pendente
+        
         Args:
             data_dir: Diretório para armazenar conversas
+            durability: Modo de gravação ("per_message", "interval" ou "manual")
         """
+        if durability not in DURABILITY_MODES:
+            logger.warning(f"Modo de gravação desconhecido '{durability}', usando 'interval'")
+            durability = "interval"
+        self.durability = durability
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.conversations_file = self.data_dir / "conversations.json"
-        self.sessions: List[Dict] = []
+        self.conversations_file = self.data_dir / "conversations.jsonl"
+        self.legacy_file = self.data_dir / "conversations.json"
+        self._sessions: Dict[str, Dict] = {}  # Sessões por id, em ordem de criação
         self.current_session_id = None
-        self.current_session_index = None
-        self._load_conversations()
+        self._pending: List[Dict] = []  # Eventos ainda não gravados em disco
+        self._file = None  # Handle de acréscimo, aberto na primeira gravação
+        self._io_lock = threading.Lock()  # Protege _pending e _file (gravador em segundo plano)
+        stale_events = self._load_conversations()
+        
+        # Agregados de get_statistics, mantidos a cada alteração em vez de recalculados
+        self._nonempty_sessions = sum(1 for s in self._sessions.values() if s["message_count"] > 0)
+        self._total_ai_messages = sum(s["ai_message_count"] for s in self._sessions.values())
+        
+        # Só compacta se nenhum outro gerenciador do processo estiver gravando no mesmo log
+        if stale_events >= COMPACT_MIN_STALE_EVENTS and not _live_managers:
+            self._compact()
+        _live_managers.add(self)
     
-    def _load_conversations(self):
-        """Carrega histórico de conversas do arquivo"""
+    @property
+    def sessions(self) -> List[Dict]:
+        """Sessões do histórico, da mais antiga para a mais recente"""
+        return list(self._sessions.values())
+    
+    def __del__(self):
+        """Grava eventos pendentes quando a sessão do usuário é descartada"""
+        try:
+            self.flush()
+            if self._file is not None:
+                self._file.close()
+        except Exception:
+            pass
+    
+    def _load_conversations(self) -> int:
+        """
+        Carrega histórico de conversas do arquivo, reaplicando os eventos do log
+        
+        Returns:
+            Quantidade de eventos do log que não fazem mais parte do histórico
+        """
+        total_events = 0
         try:
             if self.conversations_file.exists():
+                sessions_by_id: Dict[str, Dict] = {}
                 with open(self.conversations_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.sessions = data.get("sessions", [])
-                logger.info(f"Carregadas {len(self.sessions)} sessões do histórico")
+                    for line_number, line in enumerate(f, 1):
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            event = jsonio.loads(line)
+                        except json.JSONDecodeError:
+                            # Ex.: última linha truncada por uma queda do processo
+                            logger.warning(f"Linha {line_number} inválida ignorada em {self.conversations_file.name}")
+                            continue
+                        self._apply_event(sessions_by_id, event)
+                        total_events += 1
+                self._sessions = sessions_by_id
+            elif self.legacy_file.exists():
+                self._migrate_legacy_file()
+            logger.info(f"Carregadas {len(self._sessions)} sessões do histórico")
         except Exception as e:
             logger.error(f"Erro ao carregar conversas: {e}")
-            self.sessions = []
+            self._sessions = {}
+            return 0
+        
+        # Cada sessão viva corresponde a um session_started mais um evento por mensagem
+        live_events = sum(1 + len(session["messages"]) for session in self._sessions.values())
+        return max(0, total_events - live_events)
     
-    def _save_conversations(self):
-        """Salva conversas no arquivo (automático)"""
+    def _compact(self):
+        """Regrava o log só com os eventos das sessões existentes, descartando os obsoletos"""
         try:
-            data = {
-                "sessions": self.sessions,
-                "last_updated": datetime.now().isoformat()
-            }
-            with open(self.conversations_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            chunks = []
+            for session in self._sessions.values():
+                events = [{
+                    "event": "session_started",
+                    "session_id": session["session_id"],
+                    "started_at": session["started_at"]
+                }]
+                events += [
+                    {"event": "message", "session_id": session["session_id"], "message": msg}
+                    for msg in session["messages"]
+                ]
+                chunks.append("".join(jsonio.dumps(event) + "\n" for event in events))
+            
+            # Troca atômica: uma queda no meio da compactação mantém o log anterior
+            jsonio.write_atomic(self.conversations_file, "".join(chunks))
+            logger.info(f"Histórico de conversas compactado ({len(self._sessions)} sessões)")
         except Exception as e:
-            logger.error(f"Erro ao salvar conversas: {e}")
+            logger.error(f"Erro ao compactar histórico de conversas: {e}")
+    
+    def _migrate_legacy_file(self):
+        """Converte o antigo conversations.json (regravado por inteiro) para o log JSONL"""
+        with open(self.legacy_file, 'r', encoding='utf-8') as f:
+            data = jsonio.loads(f.read())
+        
+        sessions_by_id: Dict[str, Dict] = {}
+        for session in data.get("sessions", []):
+            events = [{
+                "event": "session_started",
+                "session_id": session["session_id"],
+                "started_at": session["started_at"]
+            }]
+            events += [
+                {"event": "message", "session_id": session["session_id"], "message": msg}
+                for msg in session["messages"]
+            ]
+            for event in events:
+                self._apply_event(sessions_by_id, event)
+                self._pending.append(event)
+        
+        self._sessions = sessions_by_id
+        self.flush()
+        logger.info(f"{len(self._sessions)} sessões migradas de {self.legacy_file.name} para {self.conversations_file.name}")
+    
+    @classmethod
+    def _apply_event(cls, sessions_by_id: Dict[str, Dict], event: Dict):
+        """
+        Aplica um evento do log ao estado das sessões
+        
+        Args:
+            sessions_by_id: Sessões indexadas por id (em ordem de criação)
+            event: Evento lido do arquivo
+        """
+        kind = event.get("event")
+        if kind == "session_started":
+            sessions_by_id[event["session_id"]] = {
+                "session_id": event["session_id"],
+                "started_at": event["started_at"],
+                "messages": [],
+                "message_count": 0,
+                "ai_message_count": 0,
+                "tools_used_set": []
+            }
+        elif kind == "message":
+            message = event["message"]
+            session = sessions_by_id.get(event["session_id"])
+            if session is None:
+                # A sessão foi removida (ou o histórico limpo) por outro gerenciador enquanto
+                # continuava viva neste: recria a sessão para não perder as mensagens seguintes
+                session = sessions_by_id[event["session_id"]] = {
+                    "session_id": event["session_id"],
+                    "started_at": message["timestamp"],
+                    "messages": [],
+                    "message_count": 0,
+                    "ai_message_count": 0,
+                    "tools_used_set": []
+                }
+            # Papéis e nomes de ferramentas se repetem em todo o log: uma única cópia de cada
+            message["role"] = sys.intern(message["role"])
+            if message.get("tools_used"):
+                message["tools_used"] = [[sys.intern(name), args] for name, args in message["tools_used"]]
+            cls._append_to_session(session, message)
+        elif kind == "session_deleted":
+            sessions_by_id.pop(event["session_id"], None)
+        elif kind == "history_cleared":
+            sessions_by_id.clear()
+    
+    @staticmethod
+    def _append_to_session(session: Dict, message: Dict):
+        """Adiciona uma mensagem à sessão, atualizando contadores e o índice de ferramentas"""
+        session["messages"].append(message)
+        session["message_count"] += 1
+        session["last_updated"] = message["timestamp"]
+        if message["role"] == "assistant":
+            session["ai_message_count"] += 1
+        
+        # Mantém o índice de ferramentas da sessão atualizado (exibido no histórico)
+        if message["role"] == "assistant" and message.get("tools_used"):
+            session["tools_used_set"] = sorted(
+                set(session["tools_used_set"]) | {tool_name for tool_name, _ in message["tools_used"]}
+            )
+    
+    def _record(self, event: Dict, flush: bool = True):
+        """
+        Enfileira um evento para o log
+        
+        Args:
+            event: Evento a gravar
+            flush: Se True grava imediatamente; senão ao acumular FLUSH_EVERY_MESSAGES
+                eventos ou, no máximo, após FLUSH_INTERVAL_SECONDS. Ignorado nos modos
+                "per_message" (sempre grava) e "manual" (só grava em flush())
+        """
+        with self._io_lock:
+            self._pending.append(event)
+            pending_count = len(self._pending)
+        
+        if self.durability == "manual":
+            return
+        if flush or self.durability == "per_message" or pending_count >= FLUSH_EVERY_MESSAGES:
+            self.flush()
+        else:
+            _schedule_flush()
+    
+    def flush(self):
+        """Acrescenta ao arquivo os eventos que ainda estão apenas em memória"""
+        with self._io_lock:
+            if not self._pending:
+                return
+            
+            try:
+                if self._file is None or self._file.closed:
+                    self._file = open(self.conversations_file, 'a', encoding='utf-8')
+                self._file.write("".join(jsonio.dumps(event) + "\n" for event in self._pending))
+                self._file.flush()
+                self._pending = []
+            except Exception as e:
+                logger.error(f"Erro ao salvar conversas: {e}")
     
     def start_new_session(self):
         """Inicia uma nova sessão de conversa"""
@@ -64,58 +321,99 @@ class ConversationManager:
             "session_id": self.current_session_id,
             "started_at": datetime.now().isoformat(),
             "messages": [],
-            "message_count": 0
+            "message_count": 0,
+            "ai_message_count": 0,
+            "tools_used_set": []
         }
         
-        self.sessions.append(new_session)
-        self.current_session_index = len(self.sessions) - 1
-        self._save_conversations()
+        self._sessions[self.current_session_id] = new_session
+        self._record({
+            "event": "session_started",
+            "session_id": self.current_session_id,
+            "started_at": new_session["started_at"]
+        })
         
         logger.info(f"Nova sessão iniciada e adicionada ao histórico: {self.current_session_id}")
     
-    def add_message(self, role: str, content: str, tools_used: List = None, tools_output: str = None):
+    def add_message(self, role: str, content: str, tools_used: List = None, tools_output: str = None,
+                    timestamp: str = None):
         """
         Adiciona uma mensagem à sessão atual E salva automaticamente no histórico
         
+        No modo padrão ("interval") a gravação é adiada (write-behind): as mensagens são
+        acrescentadas ao log em lotes de FLUSH_EVERY_MESSAGES, pelo gravador em segundo
+        plano após no máximo FLUSH_INTERVAL_SECONDS, em flush() ou junto com qualquer
+        outro evento. Ver durability em __init__ para os demais modos.
+        
         Args:
             role: Papel da mensagem ('user' ou 'assistant')
             content: Conteúdo da mensagem
             tools_used: Lista de ferramentas usadas (opcional)
             tools_output: Saída das ferramentas (opcional)
+            timestamp: Data/hora ISO já calculada pelo chamador (opcional), para
+                reaproveitar um único valor em todas as mensagens do turno
         """
         message = {
             "role": role,
             "content": content,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp or datetime.now().isoformat()
         }
         
         if tools_used:
-            message["tools_used"] = tools_used
+            message["tools_used"] = [(sys.intern(name), args) for name, args in tools_used]
         if tools_output:
             message["tools_output"] = tools_output
         
         # Adiciona à sessão atual no histórico
-        if self.current_session_index is not None:
-            self.sessions[self.current_session_index]["messages"].append(message)
-            self.sessions[self.current_session_index]["message_count"] = len(
-                self.sessions[self.current_session_index]["messages"]
-            )
-            self.sessions[self.current_session_index]["last_updated"] = datetime.now().isoformat()
+        session = self._sessions.get(self.current_session_id)
+        if session is not None:
+            if session["message_count"] == 0:
+                self._nonempty_sessions += 1
+            self._append_to_session(session, message)
+            if role == "assistant":
+                self._total_ai_messages += 1
             
-            # Salva automaticamente
-            self._save_conversations()
-            logger.info(f"Mensagem adicionada e salva automaticamente ({role})")
+            # Salva automaticamente a cada FLUSH_EVERY_MESSAGES mensagens
+            self._record(
+                {"event": "message", "session_id": session["session_id"], "message": message},
+                flush=False
+            )
+            logger.info(f"Mensagem adicionada ({role}, {len(self._pending)} pendentes de gravação)")
     
     def get_current_messages(self) -> List[Dict]:
         """Retorna mensagens da sessão atual"""
-        if self.current_session_index is not None:
-            return self.sessions[self.current_session_index]["messages"]
-        return []
+        session = self._sessions.get(self.current_session_id)
+        return session["messages"] if session is not None else []
     
     def get_all_sessions(self) -> List[Dict]:
         """Retorna todas as sessões salvas (exceto a atual vazia)"""
         # Retorna todas as sessões que têm pelo menos 1 mensagem
-        return [s for s in self.sessions if s["message_count"] > 0]
+        return [s for s in self._sessions.values() if s["message_count"] > 0]
+    
+    def get_sessions_summary(self) -> List[Dict]:
+        """
+        Retorna um resumo das sessões com mensagens, sem o conteúdo das mensagens
+        
+        Returns:
+            Lista de dicionários com number, session_id, started_at, message_count e
+            tools_used, da sessão mais recente para a mais antiga (number 1 = mais antiga)
+        """
+        sessions = [s for s in self._sessions.values() if s["message_count"] > 0]
+        return [
+            {
+                "number": number,
+                "session_id": session["session_id"],
+                "started_at": session["started_at"],
+                "message_count": session["message_count"],
+                "tools_used": session.get("tools_used_set", [])
+            }
+            for number, session in zip(range(len(sessions), 0, -1), reversed(sessions))
+        ]
+    
+    def get_session_messages(self, session_id: str) -> List[Dict]:
+        """Retorna as mensagens de uma sessão específica (vazio se não existir)"""
+        session = self._sessions.get(session_id)
+        return session["messages"] if session is not None else []
     
     def clear_current_session(self):
         """Limpa apenas a sessão atual da tela (mantém no histórico)"""
@@ -125,44 +423,44 @@ class ConversationManager:
     
     def delete_session(self, session_id: str):
         """Remove uma sessão específica do histórico"""
-        original_count = len(self.sessions)
-        self.sessions = [s for s in self.sessions if s["session_id"] != session_id]
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
         
-        # Atualiza índice da sessão atual se necessário
-        if self.current_session_index >= len(self.sessions):
-            self.current_session_index = len(self.sessions) - 1 if self.sessions else None
+        if session["message_count"] > 0:
+            self._nonempty_sessions -= 1
+        self._total_ai_messages -= session["ai_message_count"]
+        self._record({"event": "session_deleted", "session_id": session_id})
+        logger.info(f"Sessão {session_id} removida do histórico")
         
-        if len(self.sessions) < original_count:
-            self._save_conversations()
-            logger.info(f"Sessão {session_id} removida do histórico")
+        # Novas mensagens não podem ir para a sessão removida (nem para outra sessão)
+        if session_id == self.current_session_id:
+            self.start_new_session()
     
     def clear_all_history(self):
         """Limpa TODO o histórico de sessões salvas"""
-        self.sessions = []
-        self.current_session_index = None
-        self._save_conversations()
+        self._sessions = {}
+        self.current_session_id = None
+        self._nonempty_sessions = 0
+        self._total_ai_messages = 0
+        self._record({"event": "history_cleared"})
         logger.info("Todo histórico de conversas limpo")
         
         # Inicia nova sessão
         self.start_new_session()
     
     def get_statistics(self) -> Dict:
-        """Retorna estatísticas do histórico (apenas respostas da IA)"""
-        sessions_with_messages = [s for s in self.sessions if s["message_count"] > 0]
-        
-        # Conta apenas mensagens do assistente
-        total_ai_responses = 0
-        for session in sessions_with_messages:
-            ai_messages = [m for m in session["messages"] if m["role"] == "assistant"]
-            total_ai_responses += len(ai_messages)
+        """
+        Retorna estatísticas do histórico (apenas respostas da IA)
         
-        # Mensagens da IA na sessão atual
-        current_messages = self.get_current_messages()
-        current_ai_messages = len([m for m in current_messages if m["role"] == "assistant"])
+        Usa contadores atualizados em add_message, delete_session e clear_all_history,
+        sem percorrer as mensagens.
+        """
+        current_session = self._sessions.get(self.current_session_id)
         
         return {
-            "total_sessions": len(sessions_with_messages),
-            "total_messages": total_ai_responses,  # Apenas respostas da IA
-            "current_session_messages": current_ai_messages,
-            "has_history": len(sessions_with_messages) > 0
-        }
\ No newline at end of file
+            "total_sessions": self._nonempty_sessions,
+            "total_messages": self._total_ai_messages,  # Apenas respostas da IA
+            "current_session_messages": current_session["ai_message_count"] if current_session is not None else 0,
+            "has_history": self._nonempty_sessions > 0
+        }
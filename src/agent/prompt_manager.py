@@ -4,12 +4,18 @@ Gerenciador de Prompts com Sistema de Versionamento
 
 import json
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
 
+from .. import jsonio
+
 logger = logging.getLogger(__name__)
 
+# Incrementos de feedback_count acumulados no arquivo de deltas antes de regravar o snapshot
+FEEDBACK_COUNTS_COMPACT_EVERY = 100
+
 
 class PromptManager:
     """Gerencia prompts do agente com versionamento e histórico"""
@@ -24,12 +30,20 @@ class PromptManager:
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.prompts_file = self.data_dir / "prompts_history.json"
+        self.feedback_counts_file = self.data_dir / "prompts_feedback_counts.jsonl"
+        self._write_lock = threading.Lock()  # Snapshot e deltas não podem se intercalar
+        self._count_events = 0  # Linhas no arquivo de deltas ainda não incorporadas ao snapshot
+        self._feedback_seq = 0  # Número de sequência do último incremento gravado
         self.prompts_history: List[Dict] = []
+        self._by_version: Dict[int, int] = {}  # versão -> posição em prompts_history
+        self._total_feedbacks = 0  # Soma de feedback_count de todas as versões
         self._load_prompts()
         
         # Prompt inicial padrão
         if not self.prompts_history:
             self._initialize_default_prompt()
+        elif self._count_events >= FEEDBACK_COUNTS_COMPACT_EVERY:
+            self._save_prompts()
     
     def _initialize_default_prompt(self):
         """Inicializa com prompt padrão"""
@@ -53,6 +67,7 @@ Sempre forneça respostas completas e úteis.""",
             "improvements": ["Prompt inicial padrão"]
         }
         self.prompts_history.append(default_prompt)
+        self._by_version[default_prompt["version"]] = len(self.prompts_history) - 1
         self._save_prompts()
         logger.info("Prompt padrão inicializado")
     
@@ -61,20 +76,97 @@ Sempre forneça respostas completas e úteis.""",
         try:
             if self.prompts_file.exists():
                 with open(self.prompts_file, 'r', encoding='utf-8') as f:
-                    self.prompts_history = json.load(f)
+                    snapshot = jsonio.loads(f.read())
+                # Formato antigo: só a lista de versões, sem número de sequência
+                if isinstance(snapshot, list):
+                    snapshot = {"feedback_seq": 0, "prompts": snapshot}
+                self.prompts_history = snapshot["prompts"]
+                self._feedback_seq = snapshot["feedback_seq"]
+                self._by_version = {p["version"]: i for i, p in enumerate(self.prompts_history)}
+                self._count_events = self._replay_feedback_counts()
+                self._total_feedbacks = sum(p["feedback_count"] for p in self.prompts_history)
                 logger.info(f"Carregados {len(self.prompts_history)} prompts do histórico")
         except Exception as e:
             logger.error(f"Erro ao carregar prompts: {e}")
             self.prompts_history = []
+            self._by_version = {}
+            self._total_feedbacks = 0
+    
+    def _replay_feedback_counts(self) -> int:
+        """
+        Soma ao histórico os incrementos de feedback_count gravados após o último snapshot
+        
+        Linhas com número de sequência até o do snapshot já estão incorporadas a ele
+        (queda entre a gravação do snapshot e a remoção dos deltas) e são ignoradas.
+        
+        Returns:
+            Quantidade de linhas do arquivo de deltas ainda não incorporadas
+        """
+        if not self.feedback_counts_file.exists():
+            return 0
+        
+        snapshot_seq = self._feedback_seq
+        count_events = 0
+        with open(self.feedback_counts_file, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = jsonio.loads(line)
+                    version = event["version"]
+                    seq = event.get("seq", 0)
+                except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+                    # Ex.: última linha truncada por uma queda do processo
+                    count_events += 1
+                    logger.warning(f"Linha {line_number} inválida ignorada em {self.feedback_counts_file.name}")
+                    continue
+                # Linhas sem sequência são anteriores a ela e nunca foram incorporadas
+                if seq and seq <= snapshot_seq:
+                    continue
+                count_events += 1
+                self._feedback_seq = max(self._feedback_seq, seq)
+                index = self._by_version.get(version)
+                if index is not None:
+                    self.prompts_history[index]["feedback_count"] += 1
+        return count_events
     
     def _save_prompts(self):
-        """Salva histórico de prompts no arquivo"""
+        """
+        Salva um snapshot do histórico de prompts (JSON compacto, sem indentação)
+        
+        O snapshot já inclui os incrementos de feedback_count e guarda o número de
+        sequência do último deles, então o arquivo de deltas é descartado em seguida
+        (se o processo cair antes disso, os deltas já incorporados são ignorados ao
+        carregar).
+        """
+        with self._write_lock:
+            try:
+                snapshot = {"feedback_seq": self._feedback_seq, "prompts": self.prompts_history}
+                jsonio.write_atomic(self.prompts_file, jsonio.dumps(snapshot))
+                self.feedback_counts_file.unlink(missing_ok=True)
+                self._count_events = 0
+                logger.info("Histórico de prompts salvo com sucesso")
+            except Exception as e:
+                logger.error(f"Erro ao salvar prompts: {e}")
+    
+    def export_pretty(self, path) -> bool:
+        """
+        Exporta o histórico de prompts em JSON indentado, para leitura humana
+        
+        Args:
+            path: Caminho do arquivo de destino
+            
+        Returns:
+            True se exportado com sucesso
+        """
         try:
-            with open(self.prompts_file, 'w', encoding='utf-8') as f:
-                json.dump(self.prompts_history, f, ensure_ascii=False, indent=2)
-            logger.info("Histórico de prompts salvo com sucesso")
+            jsonio.write_atomic(path, jsonio.dumps(self.prompts_history, indent=True))
+            logger.info(f"Histórico de prompts exportado para {path}")
+            return True
         except Exception as e:
-            logger.error(f"Erro ao salvar prompts: {e}")
+            logger.error(f"Erro ao exportar prompts: {e}")
+            return False
     
     def get_current_prompt(self) -> str:
         """
@@ -97,10 +189,8 @@ Sempre forneça respostas completas e úteis.""",
         Returns:
             String com o prompt ou None se não encontrado
         """
-        for prompt_data in self.prompts_history:
-            if prompt_data["version"] == version:
-                return prompt_data["prompt"]
-        return None
+        index = self._by_version.get(version)
+        return self.prompts_history[index]["prompt"] if index is not None else None
     
     def get_history(self) -> List[Dict]:
         """
@@ -133,15 +223,35 @@ Sempre forneça respostas completas e úteis.""",
         }
         
         self.prompts_history.append(prompt_data)
+        self._by_version[new_version] = len(self.prompts_history) - 1
         self._save_prompts()
         
         logger.info(f"Prompt atualizado para versão {new_version}")
         return new_version
     
     def increment_feedback_count(self):
-        """Incrementa contador de feedbacks da versão atual"""
-        if self.prompts_history:
-            self.prompts_history[-1]["feedback_count"] += 1
+        """
+        Incrementa contador de feedbacks da versão atual
+        
+        Em vez de regravar todo o histórico, acrescenta uma linha ao arquivo de deltas;
+        o snapshot é regravado a cada FEEDBACK_COUNTS_COMPACT_EVERY incrementos.
+        """
+        if not self.prompts_history:
+            return
+        
+        with self._write_lock:
+            current = self.prompts_history[-1]
+            current["feedback_count"] += 1
+            self._total_feedbacks += 1
+            self._feedback_seq += 1
+            try:
+                with open(self.feedback_counts_file, 'a', encoding='utf-8') as f:
+                    f.write(jsonio.dumps({"version": current["version"], "seq": self._feedback_seq}) + "\n")
+                self._count_events += 1
+            except Exception as e:
+                logger.error(f"Erro ao salvar contador de feedbacks: {e}")
+        
+        if self._count_events >= FEEDBACK_COUNTS_COMPACT_EVERY:
             self._save_prompts()
     
     def get_current_version(self) -> int:
@@ -156,12 +266,11 @@ Sempre forneça respostas completas e úteis.""",
             Dicionário com estatísticas
         """
         total_versions = len(self.prompts_history)
-        total_feedbacks = sum(p["feedback_count"] for p in self.prompts_history)
         
         return {
             "total_versions": total_versions,
             "current_version": total_versions,
-            "total_feedbacks": total_feedbacks,
+            "total_feedbacks": self._total_feedbacks,
             "created_at": self.prompts_history[0]["timestamp"] if self.prompts_history else None,
             "last_update": self.prompts_history[-1]["timestamp"] if self.prompts_history else None
         }
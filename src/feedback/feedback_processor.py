@@ -3,15 +3,54 @@ Processador de Feedback Inteligente
 Analisa feedbacks e gera melhorias automáticas para o prompt
 """
 
+import hashlib
 import logging
+import string
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Tuple
-import google.generativeai as genai
 from datetime import datetime
 import json
 from pathlib import Path
 
+from .. import jsonio
+
 logger = logging.getLogger(__name__)
 
+# Quantidade de análises (prompt + feedbacks) mantidas em memória para reaproveitamento
+ANALYSIS_CACHE_SIZE = 32
+
+# Marcadores das seções da resposta da análise
+_IMPROVEMENTS_MARKER = "MELHORIAS APLICADAS:"
+_PROMPT_MARKER = "NOVO PROMPT:"
+
+# Parte fixa do pedido de análise; só o prompt atual e os feedbacks variam
+_ANALYSIS_PROMPT = string.Template("""Você é um especialista em melhorar prompts de sistemas de IA.
+
+Analise os feedbacks abaixo sobre as respostas de um assistente virtual e sugira melhorias específicas para o prompt do sistema.
+
+PROMPT ATUAL:
+$current_prompt
+
+FEEDBACKS RECEBIDOS:
+$feedbacks_text
+
+Sua tarefa:
+1. Identifique padrões e problemas nos feedbacks
+2. Sugira melhorias específicas e acionáveis
+3. Reescreva o prompt incorporando essas melhorias
+4. Mantenha a estrutura e funcionalidades existentes
+5. Seja específico sobre o que mudou
+
+Forneça sua resposta no seguinte formato:
+
+MELHORIAS APLICADAS:
+- [Lista de melhorias específicas, uma por linha]
+
+NOVO PROMPT:
+[O prompt reescrito e melhorado]
+""")
+
 
 class FeedbackProcessor:
     """Processa feedbacks e gera melhorias inteligentes para prompts"""
@@ -24,30 +63,74 @@ class FeedbackProcessor:
             api_key: Chave da API Gemini
             data_dir: Diretório para armazenar feedbacks
         """
+        # Importado aqui: o SDK é pesado e só é necessário quando o processador é criado
+        import google.generativeai as genai
+        
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-2.5-flash')
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.feedbacks_file = self.data_dir / "feedbacks.json"
+        self.feedbacks_file = self.data_dir / "feedbacks.jsonl"
+        self.legacy_file = self.data_dir / "feedbacks.json"
+        # A análise roda em background e grava no mesmo arquivo que add_feedback
+        self._write_lock = threading.Lock()
+        # Cache LRU de análises: hash do prompt e do conteúdo dos feedbacks -> (novo_prompt, melhorias)
+        self._analysis_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Somente inclusão no final: a lista fica sempre em ordem cronológica (mais recente por último)
         self.feedbacks: List[Dict] = []
         self._load_feedbacks()
+        # Contadores das estatísticas, atualizados a cada alteração (a análise roda em background)
+        self._stats_lock = threading.Lock()
+        self._rating_sum = sum(f.get("rating", 3) for f in self.feedbacks)
+        self._processed_count = sum(1 for f in self.feedbacks if f.get("processed", False))
     
     def _load_feedbacks(self):
-        """Carrega histórico de feedbacks"""
+        """Carrega histórico de feedbacks, reaplicando os eventos do log JSONL"""
         try:
             if self.feedbacks_file.exists():
+                by_id: Dict[int, Dict] = {}
                 with open(self.feedbacks_file, 'r', encoding='utf-8') as f:
-                    self.feedbacks = json.load(f)
-                logger.info(f"Carregados {len(self.feedbacks)} feedbacks")
+                    for line_number, line in enumerate(f, 1):
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            event = jsonio.loads(line)
+                        except json.JSONDecodeError:
+                            logger.warning(f"Linha {line_number} inválida ignorada em {self.feedbacks_file.name}")
+                            continue
+                        
+                        if event.get("event") == "feedback":
+                            feedback = event["feedback"]
+                            by_id[feedback["id"]] = feedback
+                            self.feedbacks.append(feedback)
+                        elif event.get("event") == "processed":
+                            for feedback_id in event["ids"]:
+                                if feedback_id in by_id:
+                                    by_id[feedback_id]["processed"] = True
+            elif self.legacy_file.exists():
+                # Converte o antigo feedbacks.json (regravado por inteiro) para o log
+                with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                    self.feedbacks = jsonio.loads(f.read())
+                self._append_events([{"event": "feedback", "feedback": fb} for fb in self.feedbacks])
+                logger.info(f"Feedbacks migrados de {self.legacy_file.name} para {self.feedbacks_file.name}")
+            logger.info(f"Carregados {len(self.feedbacks)} feedbacks")
         except Exception as e:
             logger.error(f"Erro ao carregar feedbacks: {e}")
             self.feedbacks = []
     
-    def _save_feedbacks(self):
-        """Salva feedbacks no arquivo"""
+    def _append_events(self, events: List[Dict]):
+        """
+        Acrescenta eventos ao arquivo de feedbacks (sem regravar o histórico)
+        
+        Args:
+            events: Eventos a gravar, um por linha
+        """
         try:
-            with open(self.feedbacks_file, 'w', encoding='utf-8') as f:
-                json.dump(self.feedbacks, f, ensure_ascii=False, indent=2)
+            with self._write_lock:
+                with open(self.feedbacks_file, 'a', encoding='utf-8') as f:
+                    f.write("".join(jsonio.dumps(event) + "\n" for event in events))
             logger.info("Feedbacks salvos com sucesso")
         except Exception as e:
             logger.error(f"Erro ao salvar feedbacks: {e}")
@@ -58,7 +141,7 @@ class FeedbackProcessor:
         Adiciona um novo feedback ao sistema
         """
         feedback = {
-            "id": len(self.feedbacks) + 1,
+            "id": None,
             "timestamp": datetime.now().isoformat(),
             "user_message": user_message,
             "agent_response": agent_response,
@@ -67,8 +150,12 @@ class FeedbackProcessor:
             "processed": False
         }
         
-        self.feedbacks.append(feedback)
-        self._save_feedbacks()
+        # Id e inclusão juntos: duas sessões enviando ao mesmo tempo não repetem o id
+        with self._stats_lock:
+            feedback["id"] = len(self.feedbacks) + 1
+            self.feedbacks.append(feedback)
+            self._rating_sum += rating
+        self._append_events([{"event": "feedback", "feedback": feedback}])
         
         logger.info(f"Feedback #{feedback['id']} adicionado")
                 
@@ -81,13 +168,18 @@ class FeedbackProcessor:
         """
         Retorna feedbacks recentes
         
+        Como self.feedbacks só recebe inclusões no final, os recentes são uma
+        simples fatia do fim da lista (sem ordenação).
+        
         Args:
             limit: Número máximo de feedbacks a retornar
             
         Returns:
-            Lista de feedbacks
+            Lista de feedbacks (mais recente por último)
         """
-        return self.feedbacks[-limit:] if self.feedbacks else []
+        if limit <= 0:
+            return []
+        return self.feedbacks[-limit:]
     
     def analyze_feedbacks(self, current_prompt: str, 
                          recent_count: int = 5) -> Tuple[str, List[str]]:
@@ -113,6 +205,22 @@ class FeedbackProcessor:
             logger.info("Todos os feedbacks recentes já foram processados")
             return current_prompt, ["Feedbacks já processados anteriormente"]
         
+        # Mesmo prompt com feedbacks de mesmo conteúdo (os ids mudam a cada envio, e os
+        # feedbacks analisados saem da fila): reaproveita a análise sem chamar o LLM
+        cache_key = hashlib.sha256(jsonio.dumps([
+            current_prompt,
+            [[f["user_message"], f["agent_response"], f["feedback_text"], f["rating"]]
+             for f in recent_feedbacks]
+        ]).encode("utf-8")).hexdigest()
+        with self._cache_lock:
+            cached = self._analysis_cache.get(cache_key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(cache_key)
+        if cached is not None:
+            self._mark_processed(recent_feedbacks)
+            logger.info(f"Análise reaproveitada do cache (feedbacks {[f['id'] for f in recent_feedbacks]})")
+            return cached[0], list(cached[1])
+        
         # Prepara contexto para análise
         feedbacks_text = "\n\n".join([
             f"Feedback {f['id']}:\n"
@@ -124,31 +232,10 @@ class FeedbackProcessor:
         ])
         
         # Prompt para o modelo analisar e melhorar
-        analysis_prompt = f"""Você é um especialista em melhorar prompts de sistemas de IA.
-
-Analise os feedbacks abaixo sobre as respostas de um assistente virtual e sugira melhorias específicas para o prompt do sistema.
-
-PROMPT ATUAL:
-{current_prompt}
-
-FEEDBACKS RECEBIDOS:
-{feedbacks_text}
-
-Sua tarefa:
-1. Identifique padrões e problemas nos feedbacks
-2. Sugira melhorias específicas e acionáveis
-3. Reescreva o prompt incorporando essas melhorias
-4. Mantenha a estrutura e funcionalidades existentes
-5. Seja específico sobre o que mudou
-
-Forneça sua resposta no seguinte formato:
-
-MELHORIAS APLICADAS:
-- [Lista de melhorias específicas, uma por linha]
-
-NOVO PROMPT:
-[O prompt reescrito e melhorado]
-"""
+        analysis_prompt = _ANALYSIS_PROMPT.substitute(
+            current_prompt=current_prompt,
+            feedbacks_text=feedbacks_text
+        )
         
         try:
             # Gera análise usando Gemini
@@ -158,10 +245,12 @@ NOVO PROMPT:
             # Parseia a resposta
             improvements, new_prompt = self._parse_analysis_response(result_text)
             
-            # Marca feedbacks como processados
-            for f in recent_feedbacks:
-                f["processed"] = True
-            self._save_feedbacks()
+            self._mark_processed(recent_feedbacks)
+            
+            with self._cache_lock:
+                self._analysis_cache[cache_key] = (new_prompt, list(improvements))
+                if len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                    self._analysis_cache.popitem(last=False)
             
             logger.info(f"Análise concluída: {len(improvements)} melhorias identificadas")
             return new_prompt, improvements
@@ -170,6 +259,15 @@ NOVO PROMPT:
             logger.error(f"Erro ao analisar feedbacks: {e}")
             return current_prompt, [f"Erro na análise: {str(e)}"]
     
+    def _mark_processed(self, feedbacks: List[Dict]):
+        """Marca feedbacks como processados e registra o evento no arquivo"""
+        with self._stats_lock:
+            for f in feedbacks:
+                if not f.get("processed", False):
+                    f["processed"] = True
+                    self._processed_count += 1
+        self._append_events([{"event": "processed", "ids": [f["id"] for f in feedbacks]}])
+    
     def _parse_analysis_response(self, response_text: str) -> Tuple[List[str], str]:
         """
         Parseia a resposta do modelo de análise
@@ -184,21 +282,28 @@ NOVO PROMPT:
         new_prompt = ""
         
         try:
-            # Separa melhorias e novo prompt
-            if "MELHORIAS APLICADAS:" in response_text and "NOVO PROMPT:" in response_text:
-                parts = response_text.split("NOVO PROMPT:")
-                improvements_section = parts[0].split("MELHORIAS APLICADAS:")[1].strip()
-                new_prompt = parts[1].strip()
-                
-                # Extrai lista de melhorias
-                for line in improvements_section.split('\n'):
-                    line = line.strip()
-                    if line and (line.startswith('-') or line.startswith('•')):
-                        improvements.append(line.lstrip('-•').strip())
-            else:
+            # Localiza as seções sem dividir o texto inteiro
+            improvements_start = response_text.find(_IMPROVEMENTS_MARKER)
+            prompt_start = response_text.find(_PROMPT_MARKER)
+            
+            if improvements_start == -1 or prompt_start == -1:
                 # Fallback se formato não for seguido
                 improvements = ["Análise automática de feedbacks aplicada"]
                 new_prompt = response_text
+            elif improvements_start > prompt_start:
+                raise ValueError("seção de melhorias após o novo prompt")
+            else:
+                # Novo prompt vai até uma eventual repetição do marcador
+                prompt_body_start = prompt_start + len(_PROMPT_MARKER)
+                prompt_end = response_text.find(_PROMPT_MARKER, prompt_body_start)
+                new_prompt = response_text[prompt_body_start:prompt_end if prompt_end != -1 else None].strip()
+                
+                # Extrai lista de melhorias, linha a linha, só do trecho entre os marcadores
+                improvements_section = response_text[improvements_start + len(_IMPROVEMENTS_MARKER):prompt_start]
+                for line in improvements_section.splitlines():
+                    line = line.strip()
+                    if line[:1] in ('-', '•'):
+                        improvements.append(line.lstrip('-•').strip())
                 
         except Exception as e:
             logger.error(f"Erro ao parsear resposta: {e}")
@@ -214,13 +319,12 @@ NOVO PROMPT:
         Returns:
             Dicionário com estatísticas
         """
-        total = len(self.feedbacks)
-        processed = sum(1 for f in self.feedbacks if f.get("processed", False))
+        with self._stats_lock:
+            total = len(self.feedbacks)
+            processed = self._processed_count
+            rating_sum = self._rating_sum
         
-        if total > 0:
-            avg_rating = sum(f.get("rating", 3) for f in self.feedbacks) / total
-        else:
-            avg_rating = 0
+        avg_rating = rating_sum / total if total > 0 else 0
         
         return {
             "total_feedbacks": total,
@@ -0,0 +1,59 @@
+"""
+Serialização JSON dos arquivos de dados
+
+Usa orjson (codificador em C) quando disponível e o módulo json da biblioteca
+padrão como alternativa. Em ambos os casos, erros de leitura são json.JSONDecodeError.
+"""
+
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj, indent: bool = False) -> str:
+    """
+    Serializa um objeto em JSON (UTF-8, sem escapar acentos)
+    
+    Args:
+        obj: Objeto a serializar
+        indent: Se True, indenta com 2 espaços; senão gera JSON compacto
+        
+    Returns:
+        Texto JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data):
+    """Desserializa um texto (ou bytes) JSON"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_atomic(path, text: str):
+    """
+    Regrava um arquivo inteiro sem risco de deixá-lo truncado
+    
+    O conteúdo vai para um arquivo temporário ao lado do destino, é forçado ao
+    disco e só então substitui o original com os.replace. Uma queda no meio da
+    escrita mantém a versão anterior intacta.
+    
+    Args:
+        path: Caminho do arquivo de destino
+        text: Conteúdo completo do arquivo
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
@@ -1,11 +1,31 @@
 """Módulo de ferramentas externas"""
 
-from .viacep_tool import ViaCEPTool
-from .pokemon_tool import PokemonTool
-from .ibge_tool import IBGETool
-from .openmeteo_tool import OpenMeteoTool
-from .tvmaze_tool import TVMazeTool
-from .openlibrary_tool import OpenLibraryTool
-from .lyricsovh_tool import LyricsOvhTool
-
-__all__ = ["ViaCEPTool", "PokemonTool", "IBGETool", "OpenMeteoTool", "TVMazeTool", "OpenLibraryTool", "LyricsOvhTool"]
\ No newline at end of file
+import importlib
+
+# Nome exportado -> submódulo que o define; importado só no primeiro acesso (PEP 562)
+_LAZY = {
+    "ViaCEPTool": "viacep_tool",
+    "PokemonTool": "pokemon_tool",
+    "IBGETool": "ibge_tool",
+    "OpenMeteoTool": "openmeteo_tool",
+    "TVMazeTool": "tvmaze_tool",
+    "OpenLibraryTool": "openlibrary_tool",
+    "LyricsOvhTool": "lyricsovh_tool",
+    "create_session": "http_session",
+    "get_session": "http_session",
+}
+
+__all__ = ["ViaCEPTool", "PokemonTool", "IBGETool", "OpenMeteoTool", "TVMazeTool", "OpenLibraryTool", "LyricsOvhTool", "create_session", "get_session"]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module(f".{_LAZY[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value  # Acessos seguintes não passam mais por aqui
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
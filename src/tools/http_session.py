@@ -0,0 +1,70 @@
+"""
+Sessão HTTP compartilhada pelas ferramentas externas
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def create_session() -> requests.Session:
+    """
+    Cria uma sessão HTTP com pool de conexões reutilizáveis (keep-alive)
+    
+    A mesma sessão pode ser passada a várias ferramentas: chamadas seguintes ao
+    mesmo host reaproveitam a conexão TCP/TLS já aberta. Falhas de conexão e
+    respostas 5xx transitórias são repetidas até duas vezes; timeouts de leitura
+    não, para não multiplicar a espera. Pelo mesmo motivo, Retry-After é ignorado e,
+    esgotadas as tentativas, a última resposta volta para a ferramenta tratar.
+    
+    Returns:
+        Sessão configurada
+    """
+    session = requests.Session()
+    # Accept-Encoding fica com o padrão do requests, que já inclui "br" quando o
+    # pacote brotli está instalado (anunciar br sem ele deixaria respostas ilegíveis)
+    session.headers.update({
+        'User-Agent': 'ChatbotIA/1.0',
+        'Accept': 'application/json'
+    })
+    
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(
+            total=2,
+            read=0,
+            backoff_factor=0.1,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Retorna a sessão HTTP compartilhada pelo processo, criando-a no primeiro uso
+    
+    Ferramentas criadas sem sessão explícita usam esta, então todas reaproveitam o
+    mesmo pool de conexões. Session é segura para os GETs concorrentes das ferramentas.
+    
+    Returns:
+        Sessão compartilhada
+    """
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = create_session()
+    return _shared_session
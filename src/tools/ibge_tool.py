@@ -3,23 +3,78 @@ Ferramenta de consulta de dados do IBGE
 """
 
 import logging
+import re
+import threading
+import time
+import unicodedata
 import requests
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
+
+from .. import jsonio
+from .http_session import get_session
 
 logger = logging.getLogger(__name__)
 
+# Município seguido da UF, ex.: "Campinas/SP", "Campinas - SP", "Campinas, SP"
+_UF_HINT_RE = re.compile(r"^(?P<name>.+?)\s*[/,-]\s*(?P<uf>[A-Za-z]{2})$")
+
+_REGIONS = {
+    1: ("N", "Norte"),
+    2: ("NE", "Nordeste"),
+    3: ("SE", "Sudeste"),
+    4: ("S", "Sul"),
+    5: ("CO", "Centro-Oeste"),
+}
+
+# Estados no formato de /localidades/estados: tabela fixa, consultas por UF ou nome não vão à API
+_STATES = {
+    sigla: {
+        "id": state_id,
+        "sigla": sigla,
+        "nome": nome,
+        "regiao": {"id": region_id, "sigla": _REGIONS[region_id][0], "nome": _REGIONS[region_id][1]}
+    }
+    for state_id, sigla, nome, region_id in (
+        (11, "RO", "Rondônia", 1), (12, "AC", "Acre", 1), (13, "AM", "Amazonas", 1),
+        (14, "RR", "Roraima", 1), (15, "PA", "Pará", 1), (16, "AP", "Amapá", 1),
+        (17, "TO", "Tocantins", 1), (21, "MA", "Maranhão", 2), (22, "PI", "Piauí", 2),
+        (23, "CE", "Ceará", 2), (24, "RN", "Rio Grande do Norte", 2), (25, "PB", "Paraíba", 2),
+        (26, "PE", "Pernambuco", 2), (27, "AL", "Alagoas", 2), (28, "SE", "Sergipe", 2),
+        (29, "BA", "Bahia", 2), (31, "MG", "Minas Gerais", 3), (32, "ES", "Espírito Santo", 3),
+        (33, "RJ", "Rio de Janeiro", 3), (35, "SP", "São Paulo", 3), (41, "PR", "Paraná", 4),
+        (42, "SC", "Santa Catarina", 4), (43, "RS", "Rio Grande do Sul", 4),
+        (50, "MS", "Mato Grosso do Sul", 5), (51, "MT", "Mato Grosso", 5), (52, "GO", "Goiás", 5),
+        (53, "DF", "Distrito Federal", 5),
+    )
+}
+
+
+def _normalize(name: str) -> str:
+    """Minúsculas e sem acentos, para comparar nomes ("São Paulo" == "sao paulo")"""
+    return unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+
+
+_STATES_BY_NAME = {_normalize(state["nome"]): state for state in _STATES.values()}
+
 
 class IBGETool:
     """Ferramenta para consultar informações do IBGE (estados, municípios, etc)"""
     
     BASE_URL = "https://servicodados.ibge.gov.br/api/v1"
     
-    def __init__(self):
-        """Inicializa a ferramenta IBGE"""
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'ChatbotIA/1.0'
-        })
+    # Validade (segundos) das listas completas de estados e municípios mantidas em memória
+    LIST_CACHE_TTL = 24 * 60 * 60
+    
+    def __init__(self, session: Optional[requests.Session] = None):
+        """
+        Inicializa a ferramenta IBGE
+        
+        Args:
+            session: Sessão HTTP (opcional; se omitida, usa a sessão compartilhada do processo)
+        """
+        self.session = session or get_session()
+        self._list_cache: Dict[str, tuple] = {}  # caminho -> (instante da busca, lista, nomes, índice)
+        self._list_cache_lock = threading.Lock()
     
     @property
     def name(self) -> str:
@@ -40,7 +95,8 @@ Retorna informações como:
 
 Exemplo de uso: 
 - "SP" ou "São Paulo" para info do estado
-- "Campinas" para info do município"""
+- "Campinas" para info do município
+- "Campinas/SP" para buscar o município só naquele estado"""
     
     def execute(self, query: str) -> Dict:
         """
@@ -88,6 +144,10 @@ Exemplo de uso:
     
     def _get_state_info(self, uf: str) -> Dict:
         """Busca informações de um estado pela sigla"""
+        state = _STATES.get(uf)
+        if state is not None:
+            return self._format_state(state)
+        
         url = f"{self.BASE_URL}/localidades/estados/{uf}"
         response = self.session.get(url, timeout=10)
         
@@ -98,8 +158,11 @@ Exemplo de uso:
             }
         
         response.raise_for_status()
-        data = response.json()
-        
+        return self._format_state(jsonio.loads(response.content))
+    
+    def _format_state(self, data: Dict) -> Dict:
+        """Formata dados do estado"""
+        regiao = data.get("regiao") or {}
         return {
             "error": False,
             "type": "estado",
@@ -107,64 +170,83 @@ Exemplo de uso:
             "sigla": data.get("sigla"),
             "nome": data.get("nome"),
             "regiao": {
-                "id": data.get("regiao", {}).get("id"),
-                "sigla": data.get("regiao", {}).get("sigla"),
-                "nome": data.get("regiao", {}).get("nome")
+                "id": regiao.get("id"),
+                "sigla": regiao.get("sigla"),
+                "nome": regiao.get("nome")
             }
         }
     
-    def _search_state_by_name(self, name: str) -> Optional[Dict]:
-        """Busca estado pelo nome"""
-        url = f"{self.BASE_URL}/localidades/estados"
-        response = self.session.get(url, timeout=10)
+    def _get_list(self, path: str, timeout: int) -> Tuple[List[Dict], List[str], Dict[str, int]]:
+        """
+        Busca uma listagem completa da API de localidades, reaproveitando-a por LIST_CACHE_TTL
+        
+        Estados e municípios praticamente não mudam; sem o cache, cada busca por nome
+        baixaria de novo a lista inteira (a de municípios tem alguns MB). Os nomes
+        normalizados (ver _normalize) e o índice de busca exata são montados uma vez
+        por download.
+        
+        Args:
+            path: Caminho a partir de BASE_URL (ex.: "/localidades/municipios")
+            timeout: Timeout da requisição em segundos
+            
+        Returns:
+            Tupla (lista retornada pela API, nomes normalizados na mesma ordem,
+            nome normalizado -> posição da primeira ocorrência)
+        """
+        with self._list_cache_lock:
+            cached = self._list_cache.get(path)
+        if cached is not None and time.monotonic() - cached[0] < self.LIST_CACHE_TTL:
+            return cached[1:]
+        
+        response = self.session.get(f"{self.BASE_URL}{path}", timeout=timeout)
         response.raise_for_status()
+        items = jsonio.loads(response.content)
         
-        states = response.json()
-        name_lower = name.lower()
-        
-        for state in states:
-            if state.get("nome", "").lower() == name_lower:
-                return {
-                    "error": False,
-                    "type": "estado",
-                    "id": state.get("id"),
-                    "sigla": state.get("sigla"),
-                    "nome": state.get("nome"),
-                    "regiao": {
-                        "id": state.get("regiao", {}).get("id"),
-                        "sigla": state.get("regiao", {}).get("sigla"),
-                        "nome": state.get("regiao", {}).get("nome")
-                    }
-                }
+        names = [_normalize(item.get("nome", "")) for item in items]
+        first_by_name: Dict[str, int] = {}
+        for index, item_name in enumerate(names):
+            first_by_name.setdefault(item_name, index)
         
-        return None
+        with self._list_cache_lock:
+            self._list_cache[path] = (time.monotonic(), items, names, first_by_name)
+        return items, names, first_by_name
+    
+    def _search_state_by_name(self, name: str) -> Optional[Dict]:
+        """
+        Busca estado pelo nome, só na tabela fixa (_STATES tem todas as 27 UFs)
+        
+        Nomes fora da tabela não são estados: seguem direto para a busca de
+        município, sem baixar a lista de estados da API.
+        """
+        state = _STATES_BY_NAME.get(_normalize(name))
+        return self._format_state(state) if state is not None else None
     
     def _search_municipality(self, name: str) -> Dict:
-        """Busca município pelo nome"""
-        url = f"{self.BASE_URL}/localidades/municipios"
-        response = self.session.get(url, timeout=15)
-        response.raise_for_status()
+        """Busca município pelo nome (com UF opcional, ex.: "Campinas/SP")"""
+        # Com a UF informada, basta a lista de municípios daquele estado (bem menor)
+        path = "/localidades/municipios"
+        hint = _UF_HINT_RE.match(name)
+        if hint and hint.group("uf").upper() in _STATES:
+            name = hint.group("name")
+            path = f"/localidades/estados/{hint.group('uf').upper()}/municipios"
         
-        municipalities = response.json()
-        name_lower = name.lower()
+        municipalities, names, first_by_name = self._get_list(path, timeout=15)
+        name_normalized = _normalize(name)
         
         # Busca exata primeiro
-        for mun in municipalities:
-            if mun.get("nome", "").lower() == name_lower:
-                return self._format_municipality(mun)
+        index = first_by_name.get(name_normalized)
+        if index is not None:
+            return self._format_municipality(municipalities[index])
         
         # Busca parcial
-        matches = []
-        for mun in municipalities:
-            if name_lower in mun.get("nome", "").lower():
-                matches.append(mun)
+        matches = [municipalities[i] for i, mun_name in enumerate(names) if name_normalized in mun_name]
         
         if len(matches) == 1:
             return self._format_municipality(matches[0])
         elif len(matches) > 1:
             # Retorna lista de opções
-            options = [f"{m.get('nome')} ({m.get('microrregiao', {}).get('mesorregiao', {}).get('UF', {}).get('sigla')})" 
-                      for m in matches[:5]]
+            options = [f"{m.get('nome')} ({self._municipality_regions(m)[2].get('sigla')})"
+                       for m in matches[:5]]
             return {
                 "error": False,
                 "type": "municipios_multiplos",
@@ -178,8 +260,25 @@ Exemplo de uso:
                 "message": f"Município '{name}' não encontrado."
             }
     
+    @staticmethod
+    def _municipality_regions(data: Dict) -> Tuple[Dict, Dict, Dict, Dict]:
+        """
+        Extrai as divisões aninhadas de um município da API
+        
+        Alguns municípios vêm com microrregião nula, por isso o "or {}" em cada nível.
+        
+        Returns:
+            Tupla (microrregião, mesorregião, UF, região)
+        """
+        micro = data.get("microrregiao") or {}
+        meso = micro.get("mesorregiao") or {}
+        uf = meso.get("UF") or {}
+        regiao = uf.get("regiao") or {}
+        return micro, meso, uf, regiao
+    
     def _format_municipality(self, data: Dict) -> Dict:
         """Formata dados do município"""
+        micro, meso, uf, regiao = self._municipality_regions(data)
         return {
             "error": False,
             "type": "municipio",
@@ -187,21 +286,21 @@ Exemplo de uso:
             "nome": data.get("nome"),
             "codigo_ibge": data.get("id"),
             "microrregiao": {
-                "id": data.get("microrregiao", {}).get("id"),
-                "nome": data.get("microrregiao", {}).get("nome")
+                "id": micro.get("id"),
+                "nome": micro.get("nome")
             },
             "mesorregiao": {
-                "id": data.get("microrregiao", {}).get("mesorregiao", {}).get("id"),
-                "nome": data.get("microrregiao", {}).get("mesorregiao", {}).get("nome")
+                "id": meso.get("id"),
+                "nome": meso.get("nome")
             },
             "estado": {
-                "id": data.get("microrregiao", {}).get("mesorregiao", {}).get("UF", {}).get("id"),
-                "sigla": data.get("microrregiao", {}).get("mesorregiao", {}).get("UF", {}).get("sigla"),
-                "nome": data.get("microrregiao", {}).get("mesorregiao", {}).get("UF", {}).get("nome"),
+                "id": uf.get("id"),
+                "sigla": uf.get("sigla"),
+                "nome": uf.get("nome"),
                 "regiao": {
-                    "id": data.get("microrregiao", {}).get("mesorregiao", {}).get("UF", {}).get("regiao", {}).get("id"),
-                    "sigla": data.get("microrregiao", {}).get("mesorregiao", {}).get("UF", {}).get("regiao", {}).get("sigla"),
-                    "nome": data.get("microrregiao", {}).get("mesorregiao", {}).get("UF", {}).get("regiao", {}).get("nome")
+                    "id": regiao.get("id"),
+                    "sigla": regiao.get("sigla"),
+                    "nome": regiao.get("nome")
                 }
             }
         }
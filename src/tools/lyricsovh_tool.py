@@ -6,6 +6,8 @@ import logging
 import requests
 from typing import Dict, Optional
 
+from .http_session import get_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,12 +16,14 @@ class LyricsOvhTool:
     
     BASE_URL = "https://api.lyrics.ovh/v1"
     
-    def __init__(self):
-        """Inicializa a ferramenta Lyrics.ovh"""
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'ChatbotIA/1.0'
-        })
+    def __init__(self, session: Optional[requests.Session] = None):
+        """
+        Inicializa a ferramenta Lyrics.ovh
+        
+        Args:
+            session: Sessão HTTP (opcional; se omitida, usa a sessão compartilhada do processo)
+        """
+        self.session = session or get_session()
     
     @property
     def name(self) -> str:
@@ -153,10 +157,6 @@ Exemplos de uso:
             if len(lyrics) > max_length:
                 lyrics = lyrics[:max_length] + "\n\n... (letra completa muito longa, mostrando apenas o início)"
             
-            output = f"""**{result['song']}**\n"""
-            output += f"**Artista**: {result['artist']}\n"
-            output += f"\n**Letra:**\n\n{lyrics}"
-            
-            return output
+            return f"**{result['song']}**\n**Artista**: {result['artist']}\n\n**Letra:**\n\n{lyrics}"
         
         return str(result)
\ No newline at end of file
@@ -3,22 +3,34 @@ Ferramenta de consulta de livros usando a API Open Library
 """
 
 import logging
+import re
 import requests
 from typing import Dict, Optional, List
 
+from .. import jsonio
+from .http_session import get_session
+
 logger = logging.getLogger(__name__)
 
+# Palavras descartadas da busca; só casam como token inteiro (entre espaços), como em str.split()
+_STOP_WORDS_RE = re.compile(
+    r"(?<!\S)(?:de|do|da|dos|das|o|a|os|as|em|no|na|por|pelo|pela|livro|book|by|the|of|about|sobre)(?!\S)",
+    re.IGNORECASE
+)
+
 class OpenLibraryTool:
     """Ferramenta para consultar informações sobre livros"""
     
     BASE_URL = "https://openlibrary.org"
     
-    def __init__(self):
-        """Inicializa a ferramenta Open Library"""
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'ChatbotIA/1.0'
-        })
+    def __init__(self, session: Optional[requests.Session] = None):
+        """
+        Inicializa a ferramenta Open Library
+        
+        Args:
+            session: Sessão HTTP (opcional; se omitida, usa a sessão compartilhada do processo)
+        """
+        self.session = session or get_session()
     
     @property
     def name(self) -> str:
@@ -43,24 +55,12 @@ Retorna informações como:
 """
     
     def _clean_query(self, query: str) -> str:
-        
-        stop_words = {
-            'de', 'do', 'da', 'dos', 'das', 
-            'o', 'a', 'os', 'as', 
-            'em', 'no', 'na', 
-            'por', 'pelo', 'pela',
-            'livro', 'book', 'by', 'the', 'of', 'about', 'sobre'
-        }
-        
-        parts = query.split()
-        clean_parts = [p for p in parts if p.lower() not in stop_words]
+        """Remove artigos, preposições e termos como 'livro' da consulta"""
+        clean_query = " ".join(_STOP_WORDS_RE.sub(" ", query).split())
         
         # Se a limpeza removeu tudo, usa a original
-        if not clean_parts:
-            return query
-            
-        return " ".join(clean_parts)
-
+        return clean_query or query
+    
     def execute(self, query: str) -> Dict:
         """
         Executa consulta de livro
@@ -114,7 +114,7 @@ Retorna informações como:
             response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
             
-            data = response.json()
+            data = jsonio.loads(response.content)
             docs = data.get("docs", [])
             
             if not docs:
@@ -181,36 +181,38 @@ Retorna informações como:
             authors_str = ", ".join(result.get("authors", [])[:3])
             year = f" ({result.get('first_publish_year')})" if result.get('first_publish_year') else ""
             
-            output = f"""**{result['title']}{year}**\n"""
-            output += f"\n• **Autor(es)**: {authors_str}"
+            parts = [
+                f"**{result['title']}{year}**\n",
+                f"\n• **Autor(es)**: {authors_str}"
+            ]
             
             # Editora
             if result.get("publisher"):
-                output += f"\n• **Editora**: {result['publisher']}"
+                parts.append(f"\n• **Editora**: {result['publisher']}")
             
             # Páginas
             if result.get("number_of_pages"):
-                output += f"\n• **Páginas**: {result['number_of_pages']}"
+                parts.append(f"\n• **Páginas**: {result['number_of_pages']}")
             
             # ISBN
             if result.get("isbn"):
-                output += f"\n• **ISBN**: {result['isbn']}"
+                parts.append(f"\n• **ISBN**: {result['isbn']}")
             
             # Idiomas
             if result.get("languages"):
                 langs = ", ".join(result["languages"][:3])
-                output += f"\n• **Idioma(s)**: {langs}"
+                parts.append(f"\n• **Idioma(s)**: {langs}")
             
             # Assuntos/Categorias
             if result.get("subjects"):
                 subjects_str = ", ".join(result["subjects"][:5])
-                output += f"\n\n**Categorias**: {subjects_str}"
+                parts.append(f"\n\n**Categorias**: {subjects_str}")
             
             # Link para mais informações
             if result.get("key"):
-                output += f"\n\n[Ver mais no Open Library](https://openlibrary.org{result['key']})"
+                parts.append(f"\n\n[Ver mais no Open Library](https://openlibrary.org{result['key']})")
             
-            return output
+            return "".join(parts)
         
         elif result_type == "multiple_books":
             books_list = '\n'.join([f"  - {b}" for b in result['books']])
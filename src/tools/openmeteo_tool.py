@@ -7,6 +7,8 @@ import requests
 from typing import Dict, Optional
 from datetime import datetime
 
+from .http_session import get_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,12 +18,14 @@ class OpenMeteoTool:
     GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
     WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
     
-    def __init__(self):
-        """Inicializa a ferramenta Open-Meteo"""
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'ChatbotIA/1.0'
-        })
+    def __init__(self, session: Optional[requests.Session] = None):
+        """
+        Inicializa a ferramenta Open-Meteo
+        
+        Args:
+            session: Sessão HTTP (opcional; se omitida, usa a sessão compartilhada do processo)
+        """
+        self.session = session or get_session()
     
     @property
     def name(self) -> str:
@@ -6,6 +6,8 @@ import logging
 import requests
 from typing import Dict, Optional
 
+from .http_session import get_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,12 +16,14 @@ class PokemonTool:
     
     BASE_URL = "https://pokeapi.co/api/v2"
     
-    def __init__(self):
-        """Inicializa a ferramenta PokéAPI"""
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'ChatbotIA/1.0'
-        })
+    def __init__(self, session: Optional[requests.Session] = None):
+        """
+        Inicializa a ferramenta PokéAPI
+        
+        Args:
+            session: Sessão HTTP (opcional; se omitida, usa a sessão compartilhada do processo)
+        """
+        self.session = session or get_session()
     
     @property
     def name(self) -> str:
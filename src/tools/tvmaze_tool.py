@@ -3,23 +3,31 @@ Ferramenta de consulta de séries de TV usando a API TVMaze
 """
 
 import logging
+import re
 import requests
 from typing import Dict, Optional, List
 
+from .http_session import get_session
+
 logger = logging.getLogger(__name__)
 
+# Tags HTML da sinopse retornada pela API (compilada uma única vez)
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
 
 class TVMazeTool:
     """Ferramenta para consultar informações sobre séries de TV"""
     
     BASE_URL = "https://api.tvmaze.com"
     
-    def __init__(self):
-        """Inicializa a ferramenta TVMaze"""
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'ChatbotIA/1.0'
-        })
+    def __init__(self, session: Optional[requests.Session] = None):
+        """
+        Inicializa a ferramenta TVMaze
+        
+        Args:
+            session: Sessão HTTP (opcional; se omitida, usa a sessão compartilhada do processo)
+        """
+        self.session = session or get_session()
     
     @property
     def name(self) -> str:
@@ -147,8 +155,7 @@ Exemplos de uso:
         # Remove tags HTML da sinopse
         summary = show.get("summary", "")
         if summary:
-            import re
-            summary = re.sub(r'<[^>]+>', '', summary)
+            summary = _HTML_TAG_RE.sub('', summary)
         
         # Extrai informações de network/webChannel
         network_info = None
@@ -0,0 +1,94 @@
+"""
+Testes para o chatbot (sem chamadas ao Gemini nem ao vector store)
+"""
+
+import pytest
+import tempfile
+from src.agent.chatbot import Chatbot
+
+
+@pytest.fixture
+def temp_dir():
+    """Cria diretório temporário para testes"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+class _FakeResponse:
+    """Resposta mínima do Gemini"""
+    
+    def __init__(self, text):
+        self.text = text
+
+class _FakeAnswerModel:
+    """Modelo que devolve respostas fixas, na ordem, e registra os prompts recebidos"""
+    
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.prompts = []
+    
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return _FakeResponse(self.texts.pop(0))
+
+class _FakeVectorStore:
+    """Vector store em memória: conhecimento fixo e registro das conversas gravadas"""
+    
+    def __init__(self):
+        self.conversations = []
+    
+    def search_knowledge(self, query, n_results=3):
+        if "cep" in query.lower():
+            return [{"content": "CEP é o Código de Endereçamento Postal", "similarity": 0.9}]
+        return []
+    
+    def search_similar_conversations(self, query, n_results=3):
+        return []
+    
+    def add_conversation(self, user_message, agent_response, metadata=None):
+        self.conversations.append((user_message, agent_response, metadata))
+
+@pytest.fixture
+def chatbot(temp_dir):
+    """Cria Chatbot com vector store em memória (modelo substituído em cada teste)"""
+    bot = Chatbot(api_key="test", data_dir=temp_dir)
+    bot.__dict__["vector_store"] = _FakeVectorStore()
+    yield bot
+    bot.close()
+
+def test_chat_batch_parses_json_array(chatbot):
+    """Testa que um array JSON vira uma resposta por mensagem, com o contexto de cada uma"""
+    chatbot.answer_model = _FakeAnswerModel('["Resposta 1", "Resposta 2"]')
+    
+    results = chatbot.chat_batch(["O que é CEP?", "Bom dia"])
+    
+    assert [r["response"] for r in results] == ["Resposta 1", "Resposta 2"]
+    assert [r["has_context"] for r in results] == [True, False]
+    assert "Código de Endereçamento Postal" in chatbot.answer_model.prompts[0]
+    assert [m["content"] for m in chatbot.get_history()] == ["O que é CEP?", "Resposta 1", "Bom dia", "Resposta 2"]
+    
+    chatbot.close()
+    assert [c[:2] for c in chatbot.vector_store.conversations] == [
+        ("O que é CEP?", "Resposta 1"),
+        ("Bom dia", "Resposta 2")
+    ]
+
+@pytest.mark.parametrize("model_text", ["não é JSON", '["Só uma resposta"]', '{"resposta": "x"}'])
+def test_chat_batch_falls_back_to_chat(chatbot, model_text):
+    """Testa que uma resposta fora do formato faz cada mensagem do lote passar por chat()"""
+    chatbot.answer_model = _FakeAnswerModel(model_text)
+    answered = []
+    chatbot.chat = lambda message, history=None: answered.append(message) or {"response": f"chat: {message}"}
+    
+    results = chatbot.chat_batch(["Primeira", "Segunda"])
+    
+    assert answered == ["Primeira", "Segunda"]
+    assert [r["response"] for r in results] == ["chat: Primeira", "chat: Segunda"]
+
+def test_chat_batch_splits_in_batches(chatbot):
+    """Testa que as mensagens são enviadas em lotes de até batch_size"""
+    chatbot.answer_model = _FakeAnswerModel('["A", "B"]', '["C"]')
+    
+    results = chatbot.chat_batch(["1", "2", "3"], batch_size=2)
+    
+    assert [r["response"] for r in results] == ["A", "B", "C"]
+    assert len(chatbot.answer_model.prompts) == 2
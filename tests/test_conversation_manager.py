@@ -0,0 +1,176 @@
+"""
+Testes para o gerenciador de conversas
+"""
+
+import pytest
+import tempfile
+import json
+from pathlib import Path
+from src.agent.conversation_manager import ConversationManager
+
+
+@pytest.fixture
+def temp_dir():
+    """Cria diretório temporário para testes"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+@pytest.fixture
+def conversation_manager(temp_dir):
+    """Cria instância do ConversationManager com uma sessão iniciada"""
+    manager = ConversationManager(data_dir=temp_dir)
+    manager.start_new_session()
+    return manager
+
+def test_replay_restores_sessions_and_statistics(temp_dir):
+    """Testa que recarregar o log reconstrói sessões, mensagens e estatísticas"""
+    manager = ConversationManager(data_dir=temp_dir)
+    manager.start_new_session()
+    first_session = manager.current_session_id
+    manager.add_message("user", "CEP 01001000")
+    manager.add_message("assistant", "Praça da Sé", tools_used=[("consultar_cep", {"cep": "01001000"})])
+    manager.start_new_session()
+    manager.add_message("user", "Olá")
+    manager.add_message("assistant", "Oi!")
+    manager.flush()
+    
+    reloaded = ConversationManager(data_dir=temp_dir)
+    assert [s["session_id"] for s in reloaded.sessions] == [s["session_id"] for s in manager.sessions]
+    assert [m["content"] for m in reloaded.get_session_messages(first_session)] == ["CEP 01001000", "Praça da Sé"]
+    assert reloaded.get_sessions_summary()[-1]["tools_used"] == ["consultar_cep"]
+    assert reloaded.get_statistics() == {
+        "total_sessions": 2,
+        "total_messages": 2,
+        "current_session_messages": 0,
+        "has_history": True
+    }
+
+def test_replay_ignores_truncated_last_line(temp_dir):
+    """Testa que uma linha truncada no fim do log (queda do processo) é ignorada"""
+    manager = ConversationManager(data_dir=temp_dir)
+    manager.start_new_session()
+    manager.add_message("user", "Olá")
+    manager.flush()
+    with open(manager.conversations_file, 'a', encoding='utf-8') as f:
+        f.write('{"event": "message", "session_id": "')
+    
+    reloaded = ConversationManager(data_dir=temp_dir)
+    assert [m["content"] for m in reloaded.get_session_messages(manager.current_session_id)] == ["Olá"]
+
+def test_migrate_legacy_json(temp_dir):
+    """Testa a conversão do antigo conversations.json para o log JSONL"""
+    legacy = {
+        "sessions": [
+            {
+                "session_id": "antiga",
+                "started_at": "2024-12-13T10:00:00",
+                "messages": [
+                    {"role": "user", "content": "Pikachu", "timestamp": "2024-12-13T10:00:01"},
+                    {
+                        "role": "assistant",
+                        "content": "Pokémon elétrico",
+                        "timestamp": "2024-12-13T10:00:02",
+                        "tools_used": [["consultar_pokemon", {"identificador": "pikachu"}]]
+                    }
+                ]
+            }
+        ]
+    }
+    (Path(temp_dir) / "conversations.json").write_text(json.dumps(legacy), encoding="utf-8")
+    
+    manager = ConversationManager(data_dir=temp_dir)
+    assert manager.conversations_file.exists()
+    assert [m["content"] for m in manager.get_session_messages("antiga")] == ["Pikachu", "Pokémon elétrico"]
+    assert manager.get_statistics()["total_messages"] == 1
+    
+    # O log já migrado é lido no lugar do arquivo antigo
+    reloaded = ConversationManager(data_dir=temp_dir)
+    assert reloaded.get_sessions_summary() == manager.get_sessions_summary()
+
+def test_compact_drops_stale_events(temp_dir):
+    """Testa que a compactação descarta eventos obsoletos sem alterar o histórico"""
+    manager = ConversationManager(data_dir=temp_dir)
+    manager.start_new_session()
+    manager.add_message("user", "Será removida")
+    manager.delete_session(manager.current_session_id)
+    manager.add_message("user", "Fica")
+    manager.add_message("assistant", "Ok")
+    kept_session = manager.current_session_id
+    manager.flush()
+    
+    manager._compact()
+    
+    lines = manager.conversations_file.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3  # session_started + 2 mensagens
+    reloaded = ConversationManager(data_dir=temp_dir)
+    assert [s["session_id"] for s in reloaded.sessions] == [kept_session]
+    assert [m["content"] for m in reloaded.get_session_messages(kept_session)] == ["Fica", "Ok"]
+
+def test_messages_after_clear_by_other_manager_survive_reload(temp_dir):
+    """Testa que mensagens de uma sessão viva não somem após outro gerenciador limpar o histórico"""
+    manager_b = ConversationManager(data_dir=temp_dir)
+    manager_b.start_new_session()
+    
+    manager_a = ConversationManager(data_dir=temp_dir)
+    manager_a.clear_all_history()
+    
+    manager_b.add_message("user", "Olá")
+    manager_b.add_message("assistant", "Oi!")
+    manager_b.flush()
+    
+    reloaded = ConversationManager(data_dir=temp_dir)
+    messages = reloaded.get_session_messages(manager_b.current_session_id)
+    assert [m["content"] for m in messages] == ["Olá", "Oi!"]
+    assert reloaded.get_statistics()["total_messages"] == 1
+
+def test_messages_after_delete_by_other_manager_survive_reload(temp_dir):
+    """Testa que mensagens de uma sessão viva não somem após outro gerenciador removê-la"""
+    manager_b = ConversationManager(data_dir=temp_dir)
+    manager_b.start_new_session()
+    manager_b.add_message("user", "Primeira")
+    manager_b.flush()
+    
+    manager_a = ConversationManager(data_dir=temp_dir)
+    manager_a.delete_session(manager_b.current_session_id)
+    
+    manager_b.add_message("user", "Segunda")
+    manager_b.flush()
+    
+    reloaded = ConversationManager(data_dir=temp_dir)
+    messages = reloaded.get_session_messages(manager_b.current_session_id)
+    assert [m["content"] for m in messages] == ["Segunda"]
+
+def test_delete_non_current_session_keeps_current(conversation_manager):
+    """Testa que remover outra sessão não troca a sessão atual"""
+    old_session = conversation_manager.current_session_id
+    conversation_manager.add_message("user", "Antiga")
+    conversation_manager.start_new_session()
+    current_session = conversation_manager.current_session_id
+    conversation_manager.add_message("user", "Atual")
+    
+    conversation_manager.delete_session(old_session)
+    
+    assert conversation_manager.current_session_id == current_session
+    assert [s["session_id"] for s in conversation_manager.sessions] == [current_session]
+    assert [m["content"] for m in conversation_manager.get_current_messages()] == ["Atual"]
+
+def test_delete_current_session_starts_new_one(conversation_manager):
+    """Testa que remover a sessão atual inicia outra, sem herdar as mensagens"""
+    old_session = conversation_manager.current_session_id
+    conversation_manager.add_message("user", "Antiga")
+    conversation_manager.start_new_session()
+    deleted_session = conversation_manager.current_session_id
+    conversation_manager.add_message("user", "Removida")
+    
+    conversation_manager.delete_session(deleted_session)
+    
+    current_session = conversation_manager.current_session_id
+    assert current_session not in (old_session, deleted_session)
+    assert conversation_manager.get_current_messages() == []
+    
+    conversation_manager.add_message("user", "Nova")
+    conversation_manager.flush()
+    reloaded = ConversationManager(data_dir=conversation_manager.data_dir)
+    assert [s["session_id"] for s in reloaded.sessions] == [old_session, current_session]
+    assert [m["content"] for m in reloaded.get_session_messages(current_session)] == ["Nova"]
+    assert reloaded.get_statistics()["total_sessions"] == 2
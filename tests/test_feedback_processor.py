@@ -0,0 +1,89 @@
+"""
+Testes para o processador de feedbacks
+"""
+
+import pytest
+import tempfile
+import threading
+from src.feedback.feedback_processor import FeedbackProcessor
+
+
+@pytest.fixture
+def temp_dir():
+    """Cria diretório temporário para testes"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+@pytest.fixture
+def feedback_processor(temp_dir):
+    """Cria instância do FeedbackProcessor (nenhuma chamada ao Gemini é feita)"""
+    return FeedbackProcessor(api_key="test", data_dir=temp_dir)
+
+def test_concurrent_add_feedback_assigns_unique_ids(feedback_processor, temp_dir):
+    """Testa que envios simultâneos recebem ids distintos e sequenciais"""
+    def send():
+        for _ in range(50):
+            feedback_processor.add_feedback("Oi", "Olá", "Bom", 4)
+    
+    threads = [threading.Thread(target=send) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert [f["id"] for f in feedback_processor.feedbacks] == list(range(1, 201))
+    reloaded = FeedbackProcessor(api_key="test", data_dir=temp_dir)
+    assert sorted(f["id"] for f in reloaded.feedbacks) == list(range(1, 201))
+
+def test_parse_well_formed_response(feedback_processor):
+    """Testa resposta no formato pedido"""
+    response = (
+        "MELHORIAS APLICADAS:\n"
+        "- Respostas mais curtas\n"
+        "• Usar a ferramenta de CEP\n"
+        "\n"
+        "NOVO PROMPT:\n"
+        "Você é um assistente objetivo.\n"
+        "Use as ferramentas.\n"
+    )
+    
+    improvements, new_prompt = feedback_processor._parse_analysis_response(response)
+    
+    assert improvements == ["Respostas mais curtas", "Usar a ferramenta de CEP"]
+    assert new_prompt == "Você é um assistente objetivo.\nUse as ferramentas."
+
+def test_parse_response_missing_marker(feedback_processor):
+    """Testa que sem um dos marcadores a resposta inteira vira o novo prompt"""
+    response = "MELHORIAS APLICADAS:\n- Respostas mais curtas\n\nVocê é um assistente objetivo."
+    
+    improvements, new_prompt = feedback_processor._parse_analysis_response(response)
+    
+    assert improvements == ["Análise automática de feedbacks aplicada"]
+    assert new_prompt == response
+
+def test_parse_response_with_text_around_markers(feedback_processor):
+    """Testa que texto antes, entre e depois das seções não entra no resultado"""
+    response = (
+        "Claro! Segue a análise.\n"
+        "MELHORIAS APLICADAS:\n"
+        "Analisei os feedbacks recebidos.\n"
+        "- Respostas mais curtas\n"
+        "NOVO PROMPT:\n"
+        "Você é um assistente objetivo.\n"
+        "NOVO PROMPT:\n"
+        "Observação final que não faz parte do prompt."
+    )
+    
+    improvements, new_prompt = feedback_processor._parse_analysis_response(response)
+    
+    assert improvements == ["Respostas mais curtas"]
+    assert new_prompt == "Você é um assistente objetivo."
+
+def test_parse_response_with_sections_out_of_order(feedback_processor):
+    """Testa que seções invertidas são tratadas como erro de parse"""
+    response = "NOVO PROMPT:\nVocê é um assistente.\nMELHORIAS APLICADAS:\n- Algo"
+    
+    improvements, new_prompt = feedback_processor._parse_analysis_response(response)
+    
+    assert improvements == ["Erro ao processar melhorias"]
+    assert new_prompt == response
@@ -53,6 +53,15 @@ def test_get_prompt_version(prompt_manager):
     version_999 = prompt_manager.get_prompt_version(999)
     assert version_999 is None
 
+def test_get_prompt_version_after_update_and_reload(prompt_manager, temp_dir):
+    """Testa recuperação de versões criadas depois da inicialização e após recarregar"""
+    prompt_manager.update_prompt("Prompt versão 2", ["Melhoria"])
+    assert prompt_manager.get_prompt_version(2) == "Prompt versão 2"
+    
+    reloaded = PromptManager(data_dir=temp_dir)
+    assert reloaded.get_prompt_version(2) == "Prompt versão 2"
+    assert reloaded.get_prompt_version(1) == prompt_manager.get_prompt_version(1)
+
 def test_increment_feedback_count(prompt_manager):
     """Testa incremento de contador de feedback"""
     initial_count = prompt_manager.prompts_history[-1]["feedback_count"]
@@ -102,4 +111,58 @@ def test_multiple_updates(prompt_manager):
         assert version == i + 2
     
     assert prompt_manager.get_current_version() == 4
-    assert len(prompt_manager.get_history()) == 4
\ No newline at end of file
+    assert len(prompt_manager.get_history()) == 4
+
+
+def test_feedback_count_persistence(temp_dir):
+    """Testa que incrementos de feedback sobrevivem ao recarregar, com e sem compactação"""
+    pm1 = PromptManager(data_dir=temp_dir)
+    for _ in range(3):
+        pm1.increment_feedback_count()
+    
+    pm2 = PromptManager(data_dir=temp_dir)
+    assert pm2.prompts_history[-1]["feedback_count"] == 3
+    assert pm2.get_statistics()["total_feedbacks"] == 3
+    
+    # Nova versão regrava o snapshot e descarta os deltas
+    pm2.update_prompt("Prompt versão 2", ["Melhoria"])
+    pm2.increment_feedback_count()
+    assert pm2.feedback_counts_file.read_text().count("\n") == 1
+    
+    pm3 = PromptManager(data_dir=temp_dir)
+    assert [p["feedback_count"] for p in pm3.get_history()] == [3, 1]
+    assert pm3.get_statistics()["total_feedbacks"] == 4
+
+
+def test_feedback_count_not_doubled_after_crash_during_save(temp_dir):
+    """Testa que deltas já incorporados ao snapshot não são somados de novo após uma queda"""
+    pm1 = PromptManager(data_dir=temp_dir)
+    for _ in range(2):
+        pm1.increment_feedback_count()
+    deltas = pm1.feedback_counts_file.read_text()
+    
+    # Queda simulada entre a gravação do snapshot e a remoção dos deltas
+    pm1.update_prompt("Prompt versão 2", ["Melhoria"])
+    pm1.feedback_counts_file.write_text(deltas)
+    
+    pm2 = PromptManager(data_dir=temp_dir)
+    assert [p["feedback_count"] for p in pm2.get_history()] == [2, 0]
+    
+    pm2.increment_feedback_count()
+    pm3 = PromptManager(data_dir=temp_dir)
+    assert [p["feedback_count"] for p in pm3.get_history()] == [2, 1]
+    assert pm3.get_statistics()["total_feedbacks"] == 3
+
+
+def test_load_legacy_list_snapshot(temp_dir):
+    """Testa leitura do snapshot antigo (só a lista de versões) com deltas sem sequência"""
+    pm1 = PromptManager(data_dir=temp_dir)
+    pm1.prompts_file.write_text(json.dumps(pm1.get_history()))
+    pm1.feedback_counts_file.write_text('{"version": 1}\n{"version": 1}\n')
+    
+    pm2 = PromptManager(data_dir=temp_dir)
+    assert pm2.prompts_history[-1]["feedback_count"] == 2
+    
+    pm2.increment_feedback_count()
+    pm3 = PromptManager(data_dir=temp_dir)
+    assert pm3.prompts_history[-1]["feedback_count"] == 3
@@ -2,7 +2,9 @@
 Testes para as ferramentas externas
 """
 
+import json
 import pytest
+import requests
 from src.tools import *
 
 class TestViaCEPTool:
@@ -167,6 +169,106 @@ class TestIBGETool:
         assert "São Paulo" in formatted
         assert "SP" in formatted
 
+class _FakeResponse:
+    """Resposta HTTP mínima para testes sem rede"""
+    
+    def __init__(self, payload, status_code=200):
+        self.content = json.dumps(payload).encode("utf-8")
+        self.status_code = status_code
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}")
+
+class _FakeSession:
+    """Sessão HTTP que registra as URLs pedidas e responde com dados fixos"""
+    
+    def __init__(self, responses):
+        self.responses = responses
+        self.urls = []
+    
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        for suffix, payload in self.responses.items():
+            if url.endswith(suffix):
+                return _FakeResponse(payload)
+        return _FakeResponse([], status_code=404)
+
+_CAMPINAS = {
+    "id": 3509502,
+    "nome": "Campinas",
+    "microrregiao": {
+        "id": 35032,
+        "nome": "Campinas",
+        "mesorregiao": {
+            "id": 3507,
+            "nome": "Campinas",
+            "UF": {"id": 35, "sigla": "SP", "nome": "São Paulo", "regiao": {"id": 3, "sigla": "SE", "nome": "Sudeste"}}
+        }
+    }
+}
+
+class TestIBGEToolOffline:
+    """Testes da ferramenta IBGE com a API simulada"""
+    
+    @pytest.fixture
+    def session(self):
+        return _FakeSession({
+            "/localidades/estados/SP/municipios": [_CAMPINAS],
+            "/localidades/municipios": [_CAMPINAS]
+        })
+    
+    @pytest.fixture
+    def ibge(self, session):
+        return IBGETool(session)
+    
+    @pytest.mark.parametrize("query", ["Campinas/SP", "Campinas - sp", "Campinas, SP"])
+    def test_city_with_uf_uses_state_list(self, ibge, session, query):
+        """Testa que a UF informada restringe a busca à lista de municípios do estado"""
+        result = ibge.execute(query)
+        
+        assert result.get("type") == "municipio"
+        assert result["nome"] == "Campinas"
+        assert [url.split("/v1")[1] for url in session.urls] == ["/localidades/estados/SP/municipios"]
+    
+    def test_city_with_invalid_uf_uses_full_list(self, ibge, session):
+        """Testa que uma UF inexistente não é tratada como filtro"""
+        result = ibge.execute("Campinas/XX")
+        
+        assert result.get("error")
+        assert [url.split("/v1")[1] for url in session.urls] == ["/localidades/municipios"]
+    
+    def test_unknown_name_skips_state_list(self, ibge, session):
+        """Testa que um nome fora da tabela de estados não baixa a lista de estados"""
+        result = ibge.execute("Campinas")
+        
+        assert result.get("type") == "municipio"
+        assert [url.split("/v1")[1] for url in session.urls] == ["/localidades/municipios"]
+    
+    def test_all_states_in_table(self):
+        """Testa que a tabela fixa tem as 27 UFs, com região"""
+        from src.tools.ibge_tool import _STATES
+        
+        assert len(_STATES) == 27
+        assert all(state["sigla"] == uf and state["regiao"]["sigla"] for uf, state in _STATES.items())
+    
+    @pytest.mark.parametrize("query", ["SP", "sp", "São Paulo", "sao paulo"])
+    def test_state_resolved_without_http(self, ibge, session, query):
+        """Testa que estados conhecidos são respondidos sem chamar a API"""
+        result = ibge.execute(query)
+        
+        assert result.get("type") == "estado"
+        assert result["sigla"] == "SP"
+        assert result["regiao"]["nome"] == "Sudeste"
+        assert session.urls == []
+    
+    def test_unknown_uf_falls_through_to_api(self, ibge, session):
+        """Testa que uma sigla fora da tabela ainda é consultada na API"""
+        result = ibge.execute("XX")
+        
+        assert result.get("error")
+        assert [url.split("/v1")[1] for url in session.urls] == ["/localidades/estados/XX"]
+
 class TestOpenMeteoTool:
     """Testes para ferramenta Open-Meteo"""
     
@@ -297,6 +399,28 @@ class TestOpenLibraryTool:
         assert library.name == "consulta_livro"
         assert len(library.description) > 0
     
+    @pytest.mark.parametrize("query", [
+        "o livro de a",
+        "O Senhor DOS Anéis",
+        "The Lord of the Rings by Tolkien",
+        "Dom Casmurro, de Machado de Assis",
+        "livro: O'Brien sobre A-ha",
+        "  Harry\tPotter\nE a  Pedra  ",
+        "the of by"
+    ])
+    def test_clean_query_matches_token_filter(self, library, query):
+        """Testa que a regex remove exatamente os tokens que a filtragem por split() removia"""
+        stop_words = {
+            'de', 'do', 'da', 'dos', 'das',
+            'o', 'a', 'os', 'as',
+            'em', 'no', 'na',
+            'por', 'pelo', 'pela',
+            'livro', 'book', 'by', 'the', 'of', 'about', 'sobre'
+        }
+        expected = " ".join(p for p in query.split() if p.lower() not in stop_words) or query
+        
+        assert library._clean_query(query) == expected
+    
     def test_valid_book_title(self, library):
         """Testa consulta por título de livro"""
         result = library.execute("The Lord of the Rings")